@@ -0,0 +1,92 @@
+import glob
+import os
+import time
+
+from main import *
+
+
+def benchmark_arguments():
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Compare LP engines and branching rules of branch and cut on DIMACS graphs')
+    parser.add_argument('--dir', type=str, default='DIMACS',
+                        help='Directory with dimacs-format graph files')
+    parser.add_argument('--pattern', type=str, default='*.clq.txt',
+                        help='Glob pattern of graph files inside --dir')
+    parser.add_argument('--time', type=int, default=60,
+                        help='Time limit in seconds for every single run')
+    parser.add_argument('--lp', type=str, nargs='+', default=['simplex', 'cplex'],
+                        help='LP engines to compare')
+    parser.add_argument('--branching', type=str, nargs='+', default=['reliability'],
+                        help='Branching rules to compare')
+    parser.add_argument('--mcq-vertices', type=int, default=0,
+                        help='Hand-off of small nodes to the combinatorial solver (see main.py), '
+                             'off by default so that the LP engines and branching rules do the search')
+    parser.add_argument('--mcq-density', type=float, default=0.0,
+                        help='Hand-off of sparse nodes to the combinatorial solver, off by default')
+    parser.add_argument('--workers', type=int, nargs='+',
+                        help='Measure speedup of parallel tree search for these worker counts instead, '
+                             'e.g. --workers 1 2 4 8 --pattern "brock400_*"')
+    return parser.parse_args()
+
+
+def run(graph, seconds, **options):
+    '''
+    Returns (clique size or None on timeout, seconds, search nodes, LP solves, seconds in LP)
+    '''
+    start = time.time()
+    bnc = branch_and_cut(graph, deadline=deadline(seconds), **options)
+    clique = bnc.solve
+    size = None if bnc.result()[2] else len(clique)
+    return size, time.time() - start, bnc.branch_num, bnc.lp_solves, bnc.lp_time
+
+
+def run_parallel(graph, seconds, workers, **options):
+    '''
+    Returns (clique size or None on timeout, seconds, search nodes of master and workers)
+    '''
+    start = time.time()
+    clique, stats = solve_parallel(graph, workers, deadline=deadline(seconds), **options)
+    size = None if stats['gap'] else len(clique)
+    return size, time.time() - start, stats['nodes'] + stats.get('parallel_worker_nodes', 0)
+
+
+def speedup(args):
+    print '{0:<24} {1:>7} {2:>6} {3:>10} {4:>10} {5:>8}'.format(
+        'graph', 'workers', 'clique', 'total, s', 'nodes', 'speedup')
+    for path in sorted(glob.glob(os.path.join(args.dir, args.pattern))):
+        graph = read_dimacs_graph(path)
+        name = os.path.basename(path).split('.clq')[0]
+        baseline = None
+        for workers in args.workers:
+            size, elapsed, nodes = run_parallel(graph, args.time, workers, lp_backend=args.lp[0],
+                                                mcq_vertices=args.mcq_vertices, mcq_density=args.mcq_density)
+            if baseline is None:
+                baseline = elapsed if size is not None else None
+            print '{0:<24} {1:>7} {2:>6} {3:>10.3f} {4:>10} {5:>8}'.format(
+                name, workers, '-' if size is None else size, elapsed, nodes,
+                '-' if baseline is None or size is None else '{0:.2f}'.format(baseline / elapsed))
+
+
+def main():
+    args = benchmark_arguments()
+    if args.workers:
+        speedup(args)
+        return
+    print '{0:<24} {1:<8} {2:<22} {3:>6} {4:>10} {5:>8} {6:>10} {7:>10}'.format(
+        'graph', 'lp', 'branching', 'clique', 'total, s', 'nodes', 'LP solves', 'LP, s')
+    for path in sorted(glob.glob(os.path.join(args.dir, args.pattern))):
+        graph = read_dimacs_graph(path)
+        name = os.path.basename(path).split('.clq')[0]
+        for lp_backend in args.lp:
+            for rule in args.branching:
+                size, elapsed, nodes, lp_solves, lp_time = run(graph, args.time, lp_backend=lp_backend,
+                                                               branching_rule=rule,
+                                                               mcq_vertices=args.mcq_vertices,
+                                                               mcq_density=args.mcq_density)
+                print '{0:<24} {1:<8} {2:<22} {3:>6} {4:>10.3f} {5:>8} {6:>10} {7:>10.3f}'.format(
+                    name, lp_backend, rule, '-' if size is None else size, elapsed, nodes, lp_solves, lp_time)
+
+
+if __name__ == '__main__':
+    main()
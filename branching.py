@@ -0,0 +1,166 @@
+from collections import defaultdict
+
+import cplex
+
+from separation import colour_classes
+from utils import iter_bits
+
+SCORE_EPSILON = 1e-6  # product score floor, keeps candidates with one useless side comparable
+COLOURING_CANDIDATES = 10  # candidates (largest LP values) recoloured by colouring_reduction
+
+
+class pseudo_costs(object):
+    '''
+    Per-vertex pseudo-costs: average LP bound decrease per unit change of x_v
+    when v is fixed to 0 (direction 0) or to 1 (direction 1), learned from the first
+    LP of every child and from strong branching. A vertex is reliable once both
+    directions have at least reliability observations.
+    '''
+
+    def __init__(self, reliability=4):
+        self.reliability = reliability
+        self.sums = (defaultdict(float), defaultdict(float))
+        self.counts = (defaultdict(int), defaultdict(int))
+        self.total = [0.0, 0.0]  # over all vertices, for uninitialized ones
+        self.observations = [0, 0]
+
+    def update(self, vertex, direction, gain, change):
+        if change <= SCORE_EPSILON:
+            return
+        unit_gain = max(gain, 0.0) / change
+        self.sums[direction][vertex] += unit_gain
+        self.counts[direction][vertex] += 1
+        self.total[direction] += unit_gain
+        self.observations[direction] += 1
+
+    def estimate(self, vertex, direction):
+        count = self.counts[direction].get(vertex, 0)
+        if count:
+            return self.sums[direction][vertex] / count
+        if self.observations[direction]:
+            return self.total[direction] / self.observations[direction]
+        return 1.0
+
+    def reliable(self, vertex):
+        return min(self.counts[0].get(vertex, 0), self.counts[1].get(vertex, 0)) >= self.reliability
+
+
+def product_score(down, up):
+    return max(down, SCORE_EPSILON) * max(up, SCORE_EPSILON)
+
+
+def limited_lp_bound(bnc_class, iterations):
+    '''
+    Solves RMP with at most iterations dual simplex iterations (warm started), the objective
+    of the dual feasible basis reached is an upper bound of the LP
+    returns the bound, None if the LP is infeasible, the bound of the node if the solve
+    stopped without a solution (no information)
+    '''
+    lp = bnc_class.reduced_master_problem
+    if bnc_class.lp_backend == 'cplex':
+        method = lp.parameters.lpmethod.get()
+        lp.parameters.lpmethod.set(lp.parameters.lpmethod.values.dual)  # primal or barrier bounds nothing
+        lp.parameters.simplex.limits.iterations.set(iterations)
+        try:
+            lp.solve()
+        finally:
+            lp.parameters.simplex.limits.iterations.reset()
+            lp.parameters.lpmethod.set(method)
+    else:
+        lp.iteration_limit = iterations
+        lp.solve()
+        lp.iteration_limit = None
+    if lp.solution.get_status() == 3:  # infeasible
+        return None
+    try:
+        return lp.solution.get_objective_value()
+    except cplex.exceptions.CplexSolverError:  # aborted before a basis
+        return bnc_class.current_obj_sum
+
+
+def strong_branching(bnc_class, candidates, iterations):
+    '''
+    Estimates both children of every candidate [(value, vertex)] by a few warm started
+    dual simplex iterations and feeds the bound decreases to the pseudo-costs
+    '''
+    parent = bnc_class.current_obj_sum
+    for value, v in candidates:
+        var = str(v)
+        for direction in (0, 1):
+            bounds = bnc_class.fix_variable(var, float(direction))
+            bound = limited_lp_bound(bnc_class, iterations)
+            bnc_class.restore_variable(var, bounds)
+            gain = parent if bound is None else parent - bound  # an infeasible child loses everything
+            bnc_class.pseudo_costs.update(v, direction, gain, value if direction == 0 else 1.0 - value)
+        bnc_class.branching_stats['strong_branchings'] += 1
+    bnc_class.reduced_master_problem.solve()  # back to the node's LP solution
+
+
+def reliability_branching(bnc_class, candidates):
+    '''
+    Reliability branching: unreliable candidates (at most strong_candidates of them,
+    most fractional first) are initialized by strong branching, then the candidate
+    with the best product of estimated down and up bound decreases is taken
+    candidates: [(LP value, vertex)] of fractional vertices
+    returns vertex
+    '''
+    costs = bnc_class.pseudo_costs
+    unreliable = sorted((c for c in candidates if not costs.reliable(c[1])), key=lambda c: abs(c[0] - 0.5))
+    unreliable = unreliable[:bnc_class.strong_candidates]
+    if unreliable and bnc_class.strong_iterations:
+        strong_branching(bnc_class, unreliable, bnc_class.strong_iterations)
+    return max(candidates, key=lambda c: product_score(costs.estimate(c[1], 0) * c[0],
+                                                       costs.estimate(c[1], 1) * (1.0 - c[0])))[1]
+
+
+def largest_value(bnc_class, candidates):
+    '''
+    The fractional vertex with the largest LP value
+    '''
+    return max(candidates, key=lambda c: c[0])[1]
+
+
+def fractional_neighbours(bnc_class, candidates):
+    '''
+    The fractional vertex with most fractional neighbours (ties: larger LP value):
+    fixing it moves the LP solution of most of the fractional support
+    '''
+    bit_index = bnc_class.bit_index
+    fractional = 0
+    for value, v in candidates:
+        fractional |= 1 << bit_index[v]
+    return max(candidates, key=lambda c: (bin(bnc_class.adj_bits[bit_index[c[1]]] & fractional).count('1'), c[0]))[1]
+
+
+def last_colour(bnc_class, candidates):
+    '''
+    A fractional vertex of the last colour class of the node's greedy colouring
+    (ties: larger LP value), the vertices MCQ-style search branches on first
+    '''
+    bit_index = bnc_class.bit_index
+    mask = bnc_class.node_candidates() or 0
+    colour = {}
+    for k, colour_class in enumerate(colour_classes(bnc_class, mask)):
+        for i in iter_bits(colour_class):
+            colour[i] = k
+    return max(candidates, key=lambda c: (colour.get(bit_index[c[1]], -1), c[0]))[1]
+
+
+def colouring_reduction(bnc_class, candidates):
+    '''
+    Among the COLOURING_CANDIDATES largest fractional vertices the one whose removal from
+    the node's candidates leaves the fewest colours, i.e. tightens the x = 0 child most
+    (ties: larger LP value)
+    '''
+    bit_index = bnc_class.bit_index
+    mask = bnc_class.node_candidates() or 0
+    best = sorted(candidates, reverse=True)[:COLOURING_CANDIDATES]
+    return min(best, key=lambda c: (len(colour_classes(bnc_class, mask & ~(1 << bit_index[c[1]]))), -c[0]))[1]
+
+
+# rules of branch_and_cut.get_branching_variable: (bnc_class, [(LP value, vertex)] of fractional vertices) -> vertex
+BRANCHING_RULES = {'value': largest_value,
+                   'reliability': reliability_branching,
+                   'fractional_neighbours': fractional_neighbours,
+                   'last_colour': last_colour,
+                   'colouring_reduction': colouring_reduction}
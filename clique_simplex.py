@@ -0,0 +1,522 @@
+import numpy as np
+
+# solution status codes, same values as cplex.Cplex.solution.status
+OPTIMAL = 1
+INFEASIBLE = 3
+ABORT_IT_LIM = 10
+ABORT_TIME_LIM = 11
+
+_STATUS_STRINGS = {OPTIMAL: 'optimal',
+                   INFEASIBLE: 'infeasible',
+                   ABORT_IT_LIM: 'abort_iteration_limit',
+                   ABORT_TIME_LIM: 'abort_time_limit'}
+
+_AT_LOWER = 0
+_AT_UPPER = 1
+
+
+class clique_simplex(object):
+    '''
+    Incremental bounded dual simplex for the clique LP
+
+    Problem\n
+    c1 * x1 + ... + cn * xn -> max\n
+    a_i * x <= b_i  (every row, 0/1 coefficients in practice)\n
+    l_j <= x_j <= u_j  (finite bounds)\n
+
+    Every row gets a slack s_i >= 0 (a_i * x + s_i = b_i). Since all
+    structural columns are boxed, the all-slack basis is dual feasible
+    for any objective, so the dual simplex never needs a phase one.
+    Adding rows keeps the basis dual feasible (the new slacks enter
+    basic), and so does changing bounds (nonbasic boxed columns move to
+    the bound that matches the sign of their reduced cost), hence both
+    operations are warm started.
+
+    Mirrors the subset of the cplex.Cplex interface used by
+    branch_and_cut, so it can replace cplex.Cplex() as the RMP engine.
+    '''
+
+    def __init__(self, precision=1e-9, refactor_frequency=100):
+        self.precision = precision
+        self.refactor_frequency = refactor_frequency
+        self.iteration_limit = None
+        self.deadline = None  # utils.deadline checked during solves, like the CPLEX abort callback
+
+        self.variables = _variables(self)
+        self.linear_constraints = _linear_constraints(self)
+        self.objective = _objective(self)
+        self.solution = _solution(self)
+
+        self._col_names = []
+        self._col_index = {}
+        self._obj = np.zeros(0)
+        self._lb = np.zeros(0)
+        self._ub = np.zeros(0)
+
+        self._row_names = []
+        self._row_index = {}
+        self._rows = np.zeros((0, 0))
+        self._rhs = np.zeros(0)
+        self._slack_lb = np.zeros(0)
+        self._slack_ub = np.zeros(0)
+
+        self._maximize = False
+        self._reset_basis()
+
+        self._status = None
+        self._x = np.zeros(0)
+        self._duals = np.zeros(0)
+        self.iterations = 0
+
+    # cplex.Cplex compatibility, the engine never logs anything
+    def set_log_stream(self, stream):
+        pass
+
+    def set_results_stream(self, stream):
+        pass
+
+    def set_warning_stream(self, stream):
+        pass
+
+    def set_error_stream(self, stream):
+        pass
+
+    def _reset_basis(self):
+        '''
+        Forgets the basis, the next solve starts from the slack basis
+        '''
+        self._basis = None
+        self._binv = None
+        self._nonbasic_status = None
+        self._since_refactor = 0
+
+    def _num_rows(self):
+        return len(self._row_names)
+
+    def _num_cols(self):
+        return len(self._col_names)
+
+    def _lower(self):
+        return np.concatenate((self._lb, self._slack_lb))
+
+    def _upper(self):
+        return np.concatenate((self._ub, self._slack_ub))
+
+    def _cost(self):
+        # internally the problem is always a minimization
+        cost = -self._obj if self._maximize else self._obj
+        return np.concatenate((cost, np.zeros(self._num_rows())))
+
+    def _column(self, j):
+        n = self._num_cols()
+        if j < n:
+            return self._rows[:, j]
+        unit = np.zeros(self._num_rows())
+        unit[j - n] = 1.0
+        return unit
+
+    def _basis_matrix(self):
+        m = self._num_rows()
+        n = self._num_cols()
+        matrix = np.zeros((m, m))
+        for position, j in enumerate(self._basis):
+            if j < n:
+                matrix[:, position] = self._rows[:, j]
+            else:
+                matrix[j - n, position] = 1.0
+        return matrix
+
+    def _refactor(self):
+        self._since_refactor = 0
+        try:
+            self._binv = np.linalg.inv(self._basis_matrix())
+        except np.linalg.LinAlgError:
+            self._start_from_slack_basis()
+
+    def _start_from_slack_basis(self):
+        m = self._num_rows()
+        n = self._num_cols()
+        self._basis = np.arange(n, n + m)
+        self._binv = np.eye(m)
+        self._since_refactor = 0
+        self._nonbasic_status = np.full(n + m, _AT_LOWER, dtype=int)
+
+    def _reduced_costs(self, cost):
+        n = self._num_cols()
+        y = cost[self._basis].dot(self._binv)
+        d = cost.copy()
+        d[:n] -= y.dot(self._rows)
+        d[n:] -= y
+        d[self._basis] = 0.0
+        return y, d
+
+    def _place_nonbasic(self, d, lower, upper, is_basic):
+        '''
+        Moves every boxed nonbasic column to the bound that makes it dual feasible;
+        returns False if some nonbasic column with an infinite bound is dual infeasible
+        '''
+        tol = self.precision
+        boxed = np.isfinite(lower) & np.isfinite(upper) & ~is_basic
+        self._nonbasic_status[boxed & (d < 0)] = _AT_UPPER
+        self._nonbasic_status[boxed & (d >= 0)] = _AT_LOWER
+
+        only_lower = np.isfinite(lower) & ~np.isfinite(upper) & ~is_basic
+        only_upper = ~np.isfinite(lower) & np.isfinite(upper) & ~is_basic
+        self._nonbasic_status[only_lower] = _AT_LOWER
+        self._nonbasic_status[only_upper] = _AT_UPPER
+        return not (np.any(d[only_lower] < -tol) or np.any(d[only_upper] > tol))
+
+    def _solve(self):
+        m = self._num_rows()
+        n = self._num_cols()
+        tol = self.precision
+        self.iterations = 0
+
+        if not (np.all(np.isfinite(self._lb)) and np.all(np.isfinite(self._ub))):
+            raise ValueError('clique_simplex requires finite bounds on every column')
+
+        lower = self._lower()
+        upper = self._upper()
+        cost = self._cost()
+        if np.any(lower > upper):
+            return self._finish(INFEASIBLE, None, None)
+
+        if self._basis is None:
+            self._start_from_slack_basis()
+        elif self._since_refactor >= self.refactor_frequency:
+            self._refactor()
+
+        is_basic = np.zeros(n + m, dtype=bool)
+        is_basic[self._basis] = True
+        y, d = self._reduced_costs(cost)
+        if not self._place_nonbasic(d, lower, upper, is_basic):
+            self._start_from_slack_basis()
+            is_basic[:] = False
+            is_basic[self._basis] = True
+            y, d = self._reduced_costs(cost)
+            self._place_nonbasic(d, lower, upper, is_basic)
+
+        iteration_limit = self.iteration_limit or 50 * (n + m) + 1000
+
+        while True:
+            values = np.where(self._nonbasic_status == _AT_UPPER, upper, lower)
+            values[is_basic] = 0.0
+            x_basic = self._binv.dot(self._rhs - self._rows.dot(values[:n]) - values[n:])
+            values[self._basis] = x_basic
+
+            # pricing: the basic variable with the largest bound violation leaves
+            basic_lower = lower[self._basis]
+            basic_upper = upper[self._basis]
+            violation = np.maximum(basic_lower - x_basic, x_basic - basic_upper)
+            r = int(np.argmax(violation)) if m else 0
+            if not m or violation[r] <= tol:
+                return self._finish(OPTIMAL, values, y)
+
+            if self.iterations >= iteration_limit:
+                return self._finish(ABORT_IT_LIM, values, y)
+            if self.deadline is not None and not self.iterations & 15 and self.deadline.expired():
+                return self._finish(ABORT_TIME_LIM, values, y)
+
+            leaves_to_lower = x_basic[r] < basic_lower[r]
+            row = self._binv[r]
+            alpha = np.concatenate((row.dot(self._rows), row))
+
+            at_lower = (self._nonbasic_status == _AT_LOWER) & ~is_basic
+            at_upper = (self._nonbasic_status == _AT_UPPER) & ~is_basic
+            movable = ~is_basic & (upper - lower > tol)
+            if leaves_to_lower:
+                candidates = movable & ((at_lower & (alpha < -tol)) | (at_upper & (alpha > tol)))
+            else:
+                candidates = movable & ((at_lower & (alpha > tol)) | (at_upper & (alpha < -tol)))
+            if not np.any(candidates):
+                return self._finish(INFEASIBLE, None, None)
+
+            # Harris ratio test: largest pivot among the near-minimal ratios
+            indices = np.nonzero(candidates)[0]
+            abs_alpha = np.abs(alpha[indices])
+            abs_d = np.abs(d[indices])
+            max_step = np.min((abs_d + tol) / abs_alpha)
+            eligible = abs_d / abs_alpha <= max_step
+            q = int(indices[eligible][np.argmax(abs_alpha[eligible])])
+
+            column = self._binv.dot(self._column(q))
+            theta = d[q] / alpha[q]
+            leaving = self._basis[r]
+
+            d -= theta * alpha
+            d[leaving] = -theta
+            d[q] = 0.0
+            y = y + theta * row
+
+            pivot = column[r]
+            pivot_row = self._binv[r] / pivot
+            self._binv -= np.outer(column, pivot_row)
+            self._binv[r] = pivot_row
+
+            self._basis[r] = q
+            is_basic[q] = True
+            is_basic[leaving] = False
+            self._nonbasic_status[leaving] = _AT_LOWER if leaves_to_lower else _AT_UPPER
+
+            self.iterations += 1
+            self._since_refactor += 1
+            if self._since_refactor >= self.refactor_frequency:
+                self._refactor()
+                y, d = self._reduced_costs(cost)
+
+    def _finish(self, status, values, y):
+        self._status = status
+        if values is None:
+            self._x = np.zeros(self._num_cols() + self._num_rows())
+            self._duals = np.zeros(self._num_rows())
+        else:
+            self._x = values
+            self._duals = -y if self._maximize else y
+        return status
+
+    def solve(self):
+        self._solve()
+
+    def _add_rows(self, rows, rhs, slack_lb, slack_ub, names):
+        m = self._num_rows()
+        n = self._num_cols()
+        k = len(rows)
+        if self._basis is not None:
+            # new slacks enter basic: B' = [[B, 0], [R_B, I]], B'^-1 = [[B^-1, 0], [-R_B B^-1, I]]
+            basic_structural = self._basis < n
+            new_basic = np.zeros((k, m))
+            new_basic[:, basic_structural] = rows[:, self._basis[basic_structural]]
+            binv = np.zeros((m + k, m + k))
+            binv[:m, :m] = self._binv
+            binv[m:, :m] = -new_basic.dot(self._binv)
+            binv[m:, m:] = np.eye(k)
+            self._binv = binv
+            self._basis = np.concatenate((self._basis, np.arange(n + m, n + m + k)))
+            status = self._nonbasic_status
+            self._nonbasic_status = np.concatenate((status, np.full(k, _AT_LOWER, dtype=int)))
+
+        self._rows = np.vstack((self._rows, rows)) if m else rows
+        self._rhs = np.concatenate((self._rhs, rhs))
+        self._slack_lb = np.concatenate((self._slack_lb, slack_lb))
+        self._slack_ub = np.concatenate((self._slack_ub, slack_ub))
+        for offset, name in enumerate(names):
+            self._row_index[name] = m + offset
+        self._row_names.extend(names)
+
+    def _delete_cols(self, indices):
+        n = self._num_cols()
+        keep = np.ones(n, dtype=bool)
+        keep[list(indices)] = False
+
+        if self._basis is not None:
+            if np.any(self._basis[self._basis < n][:, None] == np.asarray(indices)[None, :]):
+                self._reset_basis()  # a basic column disappears
+            else:
+                # nonbasic columns only: B is unchanged, renumber basis and statuses
+                new_index = np.concatenate((np.cumsum(keep) - 1, np.arange(n, n + self._num_rows()) - (n - keep.sum())))
+                self._basis = new_index[self._basis]
+                self._nonbasic_status = np.concatenate((self._nonbasic_status[:n][keep], self._nonbasic_status[n:]))
+
+        self._rows = self._rows[:, keep]
+        self._obj = self._obj[keep]
+        self._lb = self._lb[keep]
+        self._ub = self._ub[keep]
+        self._col_names = [name for j, name in enumerate(self._col_names) if keep[j]]
+        self._col_index = dict((name, j) for j, name in enumerate(self._col_names))
+
+    def _delete_rows(self, indices):
+        m = self._num_rows()
+        n = self._num_cols()
+        keep = np.ones(m, dtype=bool)
+        keep[list(indices)] = False
+
+        if self._basis is not None:
+            slack_positions = []
+            is_basic = np.zeros(n + m, dtype=bool)
+            is_basic[self._basis] = True
+            if all(is_basic[n + i] for i in indices):
+                # removing a row together with its basic unit column keeps B^-1 block structure
+                position = dict((j, p) for p, j in enumerate(self._basis))
+                slack_positions = [position[n + i] for i in indices]
+                keep_positions = np.ones(m, dtype=bool)
+                keep_positions[slack_positions] = False
+                self._binv = self._binv[keep_positions][:, keep]
+                new_slack_index = np.cumsum(keep) - 1
+                basis = self._basis[keep_positions]
+                slack = basis >= n
+                basis[slack] = n + new_slack_index[basis[slack] - n]
+                self._basis = basis
+                self._nonbasic_status = np.concatenate((self._nonbasic_status[:n], self._nonbasic_status[n:][keep]))
+            else:
+                # a tight row disappears, the basis would lose a column: restart from slack basis
+                self._reset_basis()
+
+        self._rows = self._rows[keep]
+        self._rhs = self._rhs[keep]
+        self._slack_lb = self._slack_lb[keep]
+        self._slack_ub = self._slack_ub[keep]
+        self._row_names = [name for i, name in enumerate(self._row_names) if keep[i]]
+        self._row_index = dict((name, i) for i, name in enumerate(self._row_names))
+
+
+def _as_list(arg):
+    return list(arg) if isinstance(arg, (list, tuple)) else [arg]
+
+
+class _variables(object):
+    def __init__(self, problem):
+        self._problem = problem
+        self.type = _variable_types()
+
+    def get_num(self):
+        return self._problem._num_cols()
+
+    def get_names(self):
+        return list(self._problem._col_names)
+
+    def get_indices(self, name):
+        if isinstance(name, (list, tuple)):
+            return [self.get_indices(x) for x in name]
+        return name if isinstance(name, int) else self._problem._col_index[name]
+
+    def add(self, obj=None, lb=None, ub=None, types=None, names=None):
+        p = self._problem
+        num = len(next(arg for arg in (obj, lb, ub, names, types) if arg is not None))
+        start = p._num_cols()
+        names = names or ['x{0}'.format(start + i) for i in range(num)]
+        p._obj = np.concatenate((p._obj, obj if obj is not None else np.zeros(num)))
+        p._lb = np.concatenate((p._lb, lb if lb is not None else np.zeros(num)))
+        p._ub = np.concatenate((p._ub, ub if ub is not None else np.full(num, np.inf)))
+        p._rows = np.hstack((p._rows, np.zeros((p._num_rows(), num))))
+        for offset, name in enumerate(names):
+            p._col_index[name] = start + offset
+        p._col_names.extend(names)
+        p._reset_basis()
+
+    def delete(self, *args):
+        p = self._problem
+        if not args:
+            indices = range(p._num_cols())
+        else:
+            indices = self.get_indices(_as_list(args[0]))
+        if indices:
+            p._delete_cols(sorted(set(indices)))
+
+    def _set(self, bounds, args):
+        indices = self.get_indices
+        pairs = args[0] if len(args) == 1 else [args]
+        for name, value in pairs:
+            bounds[indices(name)] = value
+
+    def set_lower_bounds(self, *args):
+        self._set(self._problem._lb, args)
+
+    def set_upper_bounds(self, *args):
+        self._set(self._problem._ub, args)
+
+    def _get(self, bounds, args):
+        if not args:
+            return [float(x) for x in bounds]
+        if isinstance(args[0], (list, tuple)):
+            return [float(bounds[i]) for i in self.get_indices(args[0])]
+        return float(bounds[self.get_indices(args[0])])
+
+    def get_lower_bounds(self, *args):
+        return self._get(self._problem._lb, args)
+
+    def get_upper_bounds(self, *args):
+        return self._get(self._problem._ub, args)
+
+
+class _variable_types(object):
+    continuous = 'C'
+
+
+class _linear_constraints(object):
+    def __init__(self, problem):
+        self._problem = problem
+
+    def get_num(self):
+        return self._problem._num_rows()
+
+    def get_names(self):
+        return list(self._problem._row_names)
+
+    def add(self, lin_expr=None, senses='', rhs=None, names=None):
+        p = self._problem
+        num = len(lin_expr)
+        start = p._num_rows()
+        names = names or ['c{0}'.format(start + i) for i in range(num)]
+        senses = senses or 'L' * num
+        rhs = np.asarray(rhs if rhs is not None else np.zeros(num), dtype=float)
+
+        rows = np.zeros((num, p._num_cols()))
+        for i, expr in enumerate(lin_expr):
+            ind, val = (expr.ind, expr.val) if hasattr(expr, 'ind') else expr
+            for name, coef in zip(ind, val):
+                rows[i, p.variables.get_indices(name)] += coef
+
+        slack_lb = np.zeros(num)
+        slack_ub = np.full(num, np.inf)
+        for i, sense in enumerate(senses):
+            if sense == 'E':
+                slack_ub[i] = 0.0
+            elif sense == 'G':
+                slack_lb[i], slack_ub[i] = -np.inf, 0.0
+            elif sense != 'L':
+                raise ValueError('unsupported constraint sense {0}'.format(sense))
+        p._add_rows(rows, rhs, slack_lb, slack_ub, names)
+
+    def delete(self, *args):
+        p = self._problem
+        if not args:
+            indices = range(p._num_rows())
+        else:
+            indices = [x if isinstance(x, int) else p._row_index[x] for x in _as_list(args[0])]
+        if indices:
+            p._delete_rows(sorted(set(indices)))
+
+
+class _objective(object):
+    def __init__(self, problem):
+        self._problem = problem
+        self.sense = _objective_sense()
+
+    def set_sense(self, sense):
+        self._problem._maximize = sense == self.sense.maximize
+
+
+class _objective_sense(object):
+    minimize = 1
+    maximize = -1
+
+
+class _solution(object):
+    def __init__(self, problem):
+        self._problem = problem
+
+    def get_status(self):
+        return self._problem._status
+
+    def get_status_string(self):
+        return _STATUS_STRINGS.get(self._problem._status)
+
+    def get_values(self):
+        p = self._problem
+        return [float(x) for x in p._x[:p._num_cols()]]
+
+    def get_objective_value(self):
+        p = self._problem
+        return float(p._obj.dot(p._x[:p._num_cols()]))
+
+    def get_linear_slacks(self, *args):
+        p = self._problem
+        slacks = p._x[p._num_cols():]
+        if not args:
+            return [float(s) for s in slacks]
+        if isinstance(args[0], (list, tuple)):
+            return [float(slacks[p._row_index.get(x, x)]) for x in args[0]]
+        return float(slacks[p._row_index.get(args[0], args[0])])
+
+    def get_dual_values(self):
+        return [float(y) for y in self._problem._duals]
@@ -0,0 +1,74 @@
+from utils import iter_bits
+
+
+def max_clique(bnc_class, candidates, clique=0):
+    '''
+    Colouring-based branch and bound over bitsets (MCQ / MCS style, Tomita et al.)
+    for a clique larger than the incumbent which extends clique (bitset) by vertices of
+    candidates (bitset, all adjacent to clique). Candidates are renumbered by non-increasing
+    degree, every node colours its candidates greedily in that order and branches on them by
+    decreasing colour; colour numbers bound the clique size reachable from each of them.
+    The incumbent is shared with bnc_class: it is read as the lower bound at every node
+    and improvements go through bnc_class.update_incumbent (concurrent solvers' ones are
+    picked up every 256 nodes, as is the deadline)
+    returns number of search nodes
+    '''
+    adj_bits = bnc_class.adj_bits
+    order = bnc_class.order
+    vertices = sorted(iter_bits(candidates), key=lambda i: -bin(adj_bits[i] & candidates).count('1'))
+    position = dict((i, j) for j, i in enumerate(vertices))
+    adj = []
+    for i in vertices:
+        mask = 0
+        for u in iter_bits(adj_bits[i] & candidates):
+            mask |= 1 << position[u]
+        adj.append(mask)
+    base = [order[i] for i in iter_bits(clique)]
+    nodes = [0]
+
+    def colour_sort(P, size):
+        '''
+        Vertices of P with their greedy colour numbers, by increasing colour;
+        vertices whose colour cannot lead past the incumbent are left out (they stay in P)
+        '''
+        kmin = bnc_class.current_maximum_clique_len - size
+        ranked = []
+        uncoloured = P
+        colour = 0
+        while uncoloured:
+            colour += 1
+            Q = uncoloured
+            while Q:
+                low = Q & -Q
+                j = low.bit_length() - 1
+                uncoloured &= ~low
+                Q &= ~low & ~adj[j]
+                if colour > kmin:
+                    ranked.append((j, colour))
+        return ranked
+
+    def expand(current, P):
+        nodes[0] += 1
+        if not nodes[0] & 255:
+            bnc_class.sync_incumbent()
+            bnc_class.out_of_time()
+        if bnc_class.timed_out:  # the node's bound stays with bnc_class
+            return
+        size = len(base) + len(current)
+        for j, colour in reversed(colour_sort(P, size)):
+            if size + colour <= bnc_class.current_maximum_clique_len:
+                return
+            current.append(j)
+            P_j = P & adj[j]
+            if P_j:
+                expand(current, P_j)
+            elif size + 1 > bnc_class.current_maximum_clique_len:
+                bnc_class.update_incumbent(base + [order[vertices[k]] for k in current])
+            current.pop()
+            P &= ~(1 << j)
+
+    if vertices:
+        expand([], (1 << len(vertices)) - 1)
+    elif len(base) > bnc_class.current_maximum_clique_len:
+        bnc_class.update_incumbent(base)
+    return nodes[0]
@@ -0,0 +1,186 @@
+from collections import defaultdict
+
+
+class cut_pool(object):
+    '''
+    Global pool of independent-set and rank cuts
+
+    Every independent set I gives a globally valid row sum(x_v, v in I) <= 1,
+    every rank inequality sum(x_v, v in S) <= rhs is globally valid as well,
+    so a cut removed from the RMP can always be added back later.
+    A row is active while it is in the RMP. Its age is the number of
+    consecutive LP solves with positive slack; rows reaching max_age are
+    purged (made inactive) and re-added once the LP solution violates them.
+
+    The pool never holds two comparable independent sets: a set contained
+    in a pooled one is redundant, pooled sets contained in a new one are
+    replaced by it. Rank cuts (rhs > 1) are only checked for exact duplicates.
+    '''
+
+    def __init__(self, max_age=10):
+        self.max_age = max_age
+        self.cuts = {}  # name -> frozenset of vertices
+        self.rhs = {}  # name -> right hand side
+        self.index = {}  # frozenset of vertices (independent sets) or (vertices, rhs) -> name, duplicates in O(1)
+        self.postings = defaultdict(set)  # vertex -> names of independent-set cuts containing it
+        self.age = {}  # name of active cut -> consecutive solves with positive slack
+        self.inactive = set()
+
+        self.added = 0
+        self.purged = 0
+        self.reactivated = 0
+        self.duplicates = 0
+        self.dominated = 0
+        self.replaced = 0
+
+    def _superset(self, vertices):
+        '''
+        Name of a pooled cut containing vertices (active one if possible) or None
+        '''
+        if vertices in self.index:
+            return self.index[vertices]
+        postings = sorted((self.postings.get(v, set()) for v in vertices), key=len)
+        if not postings or not postings[0]:
+            return None
+        names = set(postings[0])
+        for posting in postings[1:]:
+            names &= posting
+            if not names:
+                return None
+        active = [name for name in names if name in self.age]
+        return active[0] if active else next(iter(names))
+
+    def _subsets(self, vertices):
+        '''
+        Names of pooled cuts strictly contained in vertices
+        '''
+        counts = defaultdict(int)
+        for v in vertices:
+            for name in self.postings.get(v, ()):
+                counts[name] += 1
+        return [name for name, count in counts.items()
+                if count == len(self.cuts[name]) and count < len(vertices)]
+
+    def _remove(self, name):
+        vertices = self.cuts.pop(name)
+        del self.rhs[name]
+        del self.index[vertices]
+        for v in vertices:
+            self.postings[v].discard(name)
+        self.age.pop(name, None)
+        self.inactive.discard(name)
+
+    def _activate(self, name):
+        self.inactive.remove(name)
+        self.age[name] = 0
+        self.reactivated += 1
+
+    def add(self, name, vertices, rhs=1.0):
+        '''
+        Registers sum(x_v, v in vertices) <= rhs (an independent set if rhs is 1) as an active cut
+        returns (rows to add to RMP as [(name, vertices)], names of rows to delete from RMP)
+        '''
+        vertices = frozenset(vertices)
+        if rhs != 1.0:
+            key = (vertices, rhs)
+            if key in self.index:
+                self.duplicates += 1
+                name = self.index[key]
+                if name in self.age:
+                    return [], []
+                self._activate(name)
+                return [(name, vertices)], []
+            self.cuts[name] = vertices
+            self.rhs[name] = rhs
+            self.index[key] = name
+            self.age[name] = 0
+            self.added += 1
+            return [(name, vertices)], []
+
+        dominating = self._superset(vertices)
+        if dominating is not None:
+            if self.cuts[dominating] == vertices:
+                self.duplicates += 1
+            else:
+                self.dominated += 1
+            if dominating in self.age:
+                return [], []
+            self._activate(dominating)
+            return [(dominating, self.cuts[dominating])], []
+
+        delete = []
+        for subset in self._subsets(vertices):
+            if subset in self.age:
+                delete.append(subset)
+            self._remove(subset)
+            self.replaced += 1
+
+        self.cuts[name] = vertices
+        self.rhs[name] = rhs
+        self.index[vertices] = name
+        for v in vertices:
+            self.postings[v].add(name)
+        self.age[name] = 0
+        self.added += 1
+        return [(name, vertices)], delete
+
+    def update(self, names, slacks, precision):
+        '''
+        Ages active cuts by LP slacks (names and slacks as returned by the LP),
+        returns names of cuts to purge from the RMP
+        '''
+        purge = []
+        for name, slack in zip(names, slacks):
+            if name not in self.age:
+                continue
+            if slack > precision:
+                self.age[name] += 1
+                if self.age[name] >= self.max_age:
+                    purge.append(name)
+            else:
+                self.age[name] = 0
+
+        for name in purge:
+            del self.age[name]
+            self.inactive.add(name)
+        self.purged += len(purge)
+        return purge
+
+    def violated(self, weights, precision):
+        '''
+        weights: dict vertex -> LP value
+        returns [(name, vertices)] of inactive cuts violated by weights, they become active again
+        '''
+        cuts = [(name, self.cuts[name]) for name in self.inactive
+                if sum(weights.get(v, 0.0) for v in self.cuts[name]) > self.rhs[name] + precision]
+        for name, _ in cuts:
+            self._activate(name)
+        return cuts
+
+    def snapshot(self):
+        '''
+        returns [(vertices, rhs)] of all pooled cuts, e.g. for a checkpoint
+        '''
+        return [(tuple(vertices), self.rhs[name]) for name, vertices in self.cuts.items()]
+
+    def deactivate(self, names):
+        '''
+        Makes active cuts inactive without counting them as purged,
+        returns names of rows to delete from the RMP
+        '''
+        names = [name for name in names if name in self.age]
+        for name in names:
+            del self.age[name]
+            self.inactive.add(name)
+        return names
+
+    def statistics(self):
+        return {'pool_size': len(self.cuts),
+                'active': len(self.age),
+                'inactive': len(self.inactive),
+                'added': self.added,
+                'purged': self.purged,
+                'reactivated': self.reactivated,
+                'duplicates': self.duplicates,
+                'dominated': self.dominated,
+                'replaced': self.replaced}
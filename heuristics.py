@@ -0,0 +1,151 @@
+import time
+
+from utils import iter_bits
+
+
+def _pick(bnc_class, mask, key):
+    '''
+    Vertex (bit number) of mask with the smallest key, ties broken at random
+    '''
+    best_key, best = None, []
+    for i in iter_bits(mask):
+        k = key(i)
+        if best_key is None or k < best_key:
+            best_key, best = k, [i]
+        elif k == best_key:
+            best.append(i)
+    return bnc_class.random.choice(best)
+
+
+def greedy_clique(bnc_class, start, rcl_size=3):
+    '''
+    Randomized greedy clique from start: every step takes one of the rcl_size
+    candidates with most neighbours among the remaining candidates
+    returns list of bit numbers
+    '''
+    adj_bits = bnc_class.adj_bits
+    rng = bnc_class.random
+    clique = [start]
+    candidates = adj_bits[start]
+    while candidates:
+        ranked = sorted(iter_bits(candidates), key=lambda i: -bin(adj_bits[i] & candidates).count('1'))
+        i = rng.choice(ranked[:rcl_size])
+        clique.append(i)
+        candidates &= adj_bits[i]
+    return clique
+
+
+def dynamic_local_search(bnc_class, clique, deadline, max_steps, penalty_delay=2):
+    '''
+    Dynamic local search for a larger clique, in the style of DLS-MC:
+    add a vertex adjacent to the whole clique if possible, otherwise make a plateau
+    swap (a vertex adjacent to all clique vertices but one replaces that one),
+    otherwise penalize the clique vertices and restart from a random vertex
+    keeping its neighbours in the clique. Candidates with lower penalty are preferred.
+    clique: list of bit numbers
+    returns the largest clique seen, list of bit numbers
+    '''
+    adj_bits = bnc_class.adj_bits
+    rng = bnc_class.random
+    n = len(adj_bits)
+    penalties = [0] * n
+    best = list(clique)
+    clique = list(clique)
+    tabu = None  # vertex swapped out by the last plateau move
+    perturbations = 0
+
+    for step in range(max_steps):
+        if step & 63 == 0 and time.time() > deadline:
+            break
+        # prefix[i] / suffix[i] - common neighbourhood of clique[:i] / clique[i:]
+        full = (1 << n) - 1
+        prefix = [full]
+        for v in clique:
+            prefix.append(prefix[-1] & adj_bits[v])
+        suffix = [full]
+        for v in reversed(clique):
+            suffix.append(suffix[-1] & adj_bits[v])
+        suffix.reverse()
+
+        common = prefix[-1]
+        if common:
+            clique.append(_pick(bnc_class, common, lambda i: penalties[i]))
+            if len(clique) > len(best):
+                best = list(clique)
+            continue
+
+        swaps = []
+        for position, v in enumerate(clique):
+            missing_v = prefix[position] & suffix[position + 1] & ~adj_bits[v] & ~(1 << v)
+            if tabu is not None:
+                missing_v &= ~(1 << tabu)
+            if missing_v:
+                swaps.append((position, missing_v))
+        if swaps:
+            position, candidates = rng.choice(swaps)
+            tabu = clique[position]
+            clique[position] = _pick(bnc_class, candidates, lambda i: penalties[i])
+            continue
+
+        for v in clique:
+            penalties[v] += 1
+        perturbations += 1
+        if perturbations % penalty_delay == 0:
+            penalties = [max(p - 1, 0) for p in penalties]
+        v = rng.randrange(n)
+        clique = [v] + [u for u in clique if adj_bits[v] >> u & 1]
+        tabu = None
+    return best
+
+
+def initial_clique(bnc_class, time_budget=1.0, starts=None, steps_per_start=2000):
+    '''
+    Multi-start primal heuristic: randomized greedy from high degree vertices (every vertex
+    if starts is None), each followed by dynamic local search, until time_budget runs out
+    returns list of vertices
+    '''
+    order = bnc_class.order
+    if not order:
+        return []
+    deadline = time.time() + time_budget
+    adj_bits = bnc_class.adj_bits
+    by_degree = sorted(range(len(order)), key=lambda i: -bin(adj_bits[i]).count('1'))
+    if starts is not None:
+        by_degree = by_degree[:starts]
+
+    best = [by_degree[0]]
+    for start in by_degree:
+        if time.time() > deadline:
+            break
+        clique = greedy_clique(bnc_class, start)
+        clique = dynamic_local_search(bnc_class, clique, deadline, steps_per_start)
+        if len(clique) > len(best):
+            best = clique
+    return [order[i] for i in best]
+
+
+def lp_rounding(bnc_class, steps=100):
+    '''
+    LP-guided primal heuristic: takes vertices by decreasing LP value while they are
+    adjacent to everything taken so far, completes the clique greedily within the common
+    neighbourhood (most neighbours among the remaining candidates first), then runs a
+    short dynamic local search
+    returns list of vertices
+    '''
+    adj_bits = bnc_class.adj_bits
+    bit_index = bnc_class.bit_index
+    order = bnc_class.order
+    candidates = (1 << len(order)) - 1
+    clique = []
+    for weight, v in sorted(zip(bnc_class.clique_candidates_weights, bnc_class.clique_candidates), reverse=True):
+        i = bit_index[v]
+        if candidates >> i & 1:
+            clique.append(i)
+            candidates &= adj_bits[i]
+    while candidates:
+        i = max(iter_bits(candidates), key=lambda j: bin(adj_bits[j] & candidates).count('1'))
+        clique.append(i)
+        candidates &= adj_bits[i]
+    if steps:
+        clique = dynamic_local_search(bnc_class, clique, time.time() + 1.0, steps)
+    return [order[i] for i in clique]
@@ -1,29 +1,176 @@
 from utils import *
 from sandbox import *
-from networkx.algorithms.approximation.clique import max_clique
+from clique_simplex import clique_simplex
+from cut_pool import cut_pool
+from separation import violated_independent_sets, exact_mwis, lift_independent_set, odd_hole_cuts, colour_classes
+from heuristics import initial_clique, lp_rounding
+from preprocessing import peel, components_by_bound, later_neighbourhoods
+from combinatorial import max_clique
+from parallel import PORTFOLIO, collect, race, shared_incumbent, tree_search, _init_component_worker, _reset_signals, _worker
+from branching import pseudo_costs, BRANCHING_RULES
+from symmetry import automorphisms, orbit
 import cplex
+import math
+import multiprocessing
+import Queue
+import random
+import signal
 import sys
 sys.setrecursionlimit(3000)
 
 
 class branch_and_cut:
-    def __init__(self, graph, precision=1e-5):
-        self.graph = graph
-        self.adj_matrix = nx.adjacency_matrix(self.graph)
+    def __init__(self, graph, precision=1e-5, lp_backend='simplex', cut_max_age=10, cut_batch=8,
+                 exact_nodes=20000, exact_time=1.0, ls_perturbations=10, seed=0,
+                 root_cut_rounds=100, cut_round_decay=0.5, min_cut_rounds=2,
+                 tail_window=3, tail_gain=1e-3, tail_rate=1e-3, heuristic_time=1.0, rounding_steps=100,
+                 peeling='edges', decomposition='components', processes=1, node_colouring='rows',
+                 mcq_vertices=150, mcq_density=0.1, race_depth=0,
+                 branching_rule='reliability', reliability=4, strong_candidates=8, strong_iterations=10,
+                 symmetry_time=2.0, checkpoint=None, checkpoint_interval=60.0, resume=False,
+                 deadline=None, incumbent=None, shared=None):
+        self.options = dict((key, value) for key, value in locals().items()
+                            if key not in ('self', 'graph', 'incumbent', 'shared'))  # passed on to subproblems
+        self.graph = graph.copy()  # preprocessing removes vertices and edges
+        # anytime search: past deadline (utils.deadline) nodes are left open and their bounds kept,
+        # the LP engine checks it during solves
+        self.deadline = deadline
+        self.timed_out = False
+        # (fixed_zero, fixed_one, parent bound) of the x = 1 children of ancestors still to come
+        self.open_children = []
+        self.node_bound = graph.number_of_nodes()  # bound of the current node
+        self.timeout_bound = None  # max of the above when the deadline passed
+        self.extra_bound = None  # bound of work left open by subproblems and workers
+        self.left_open = []  # (fixed_zero, fixed_one, bound) of raced children left open, see race_children
+        self.lp_backend = lp_backend  # 'simplex' - in-house clique_simplex, 'cplex' - general CPLEX solver
+        self.cut_pool = cut_pool(max_age=cut_max_age)  # all independent-set rows, purged when slack for too long
+        self.order, self.bit_index, self.adj_bits = bitset_adjacency(self.graph)
+        self.alive_mask = (1 << len(self.order)) - 1  # vertices not removed by preprocessing
         self.precision = precision
         self.nodes = self.graph.nodes
         self.ind_sets = []
         self.not_connected = nx.complement(self.graph).edges  # dopolnenie grapha
-        # self.current_maximum_clique_len = len(max_clique(self.graph))
-        # self.heuristic_max_clique =
-        # self.heuristic_max_clique_len =
-        # print(self.heuristic_max_clique_len)
-        self.current_max_clique = max_clique(self.graph)
+        self.random = random.Random(seed)
+        # checkpoints: the search state goes to the checkpoint file every checkpoint_interval seconds
+        # and when the deadline passes; with resume the search continues from that file if it exists
+        self.checkpoint = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.next_checkpoint = time.time() + checkpoint_interval
+        self.graph_digest = graph_hash(graph) if checkpoint is not None else None  # graph of the checkpoint
+        state = read_checkpoint(checkpoint) if resume and checkpoint is not None else None
+        if state is not None:
+            if state['graph'] != self.graph_digest:
+                raise ValueError('checkpoint {0} is of another graph'.format(checkpoint))
+            if incumbent is None or len(state['incumbent']) > len(incumbent):
+                incumbent = state['incumbent']
+        self.current_max_clique = initial_clique(self, heuristic_time)  # multi-start greedy + local search
+        if incumbent is not None and len(incumbent) > len(self.current_max_clique):  # e.g. from the parent problem
+            self.current_max_clique = list(incumbent)
         self.current_maximum_clique_len = len(self.current_max_clique)
+        self.shared = shared  # parallel.shared_incumbent of concurrent solvers or None
+        if shared is not None:
+            shared.publish(self.current_max_clique)
         self.branch_num = 0
+        self.mwis_counter = 0
+        self.max_cut_batch = cut_batch
+        self.cut_batch = cut_batch  # adapted by tightness of the previous batch
+        self.last_batch = []
+        self.exact_nodes = exact_nodes  # search budget of exact MWIS separation per call
+        self.exact_time = exact_time
+        self.ls_perturbations = ls_perturbations  # ILS perturbations per separated set
+        self.fractional_count = [0] * len(self.order)  # per bit number, LP solutions where the vertex was fractional
+        self.separation_stats = {'pool_rounds': 0, 'independent_set_cuts': 0,
+                                 'exact_calls': 0, 'exact_cuts': 0, 'exact_incomplete': 0,
+                                 'ls_calls': 0, 'ls_improved': 0, 'ls_rescued': 0, 'lifted_vertices': 0,
+                                 'odd_hole_calls': 0, 'odd_hole_cuts': 0}
+        self.lp_solves = 0
+        self.lp_time = 0.0
+        self.depth = 0
 
-        self.get_ind_sets()
-        self.reduced_master_problem = self.construct_reduced_master_problem()
+        # cut loop: rounds allowed at depth d - max(min_cut_rounds, root_cut_rounds * cut_round_decay ** d)
+        self.root_cut_rounds = root_cut_rounds
+        self.cut_round_decay = cut_round_decay
+        self.min_cut_rounds = min_cut_rounds
+        # tailing off - relative bound gain over the last tail_window rounds below tail_gain,
+        # or below tail_rate per second spent in those rounds
+        self.tail_window = tail_window
+        self.tail_gain = tail_gain
+        self.tail_rate = tail_rate
+        self.cut_loop_stats = {'cut_rounds': 0, 'cut_time': 0.0, 'max_round_time': 0.0,
+                               'round_limit_stops': 0, 'tailing_off_stops': 0}
+        self.rounds_by_depth = {}  # depth -> [rounds, seconds]
+        self.rounding_steps = rounding_steps  # local search steps of LP rounding heuristic, None - no rounding
+        self.heuristic_stats = {'rounding_calls': 0, 'rounding_improvements': 0}
+        self.peeling = peeling  # None, 'vertices' - k-core peeling, 'edges' - also edges by common neighbours
+        self.preprocessing_stats = {'peel_runs': 0, 'peeled_vertices': 0, 'peeled_edges': 0}
+        self.lp_stale = False  # LP columns were removed after the last solve
+        # None, 'bound' - prune nodes by a greedy colouring before the LP, 'rows' - also add its classes to RMP
+        self.node_colouring = node_colouring
+        self.fixed_zero = 0  # bitsets of vertices fixed by branching at the current node
+        self.fixed_one = 0
+        self.node_stats = {'colouring_pruned': 0, 'colour_rows': 0}
+        # hybrid policy: nodes with at most mcq_vertices candidates or candidate density
+        # at most mcq_density are solved by the combinatorial engine (max_clique) instead of the LP
+        self.mcq_vertices = mcq_vertices
+        self.mcq_density = mcq_density
+        self.mcq_stats = {'mcq_calls': 0, 'mcq_nodes': 0, 'mcq_improvements': 0}
+        self.race_depth = race_depth  # branchings above this depth solve both children in parallel processes
+        self.race_stats = {'races': 0, 'dead_children': 0}
+        self.branching_rule = branching_rule  # name in branching.BRANCHING_RULES
+        self.pseudo_costs = pseudo_costs(reliability)
+        if state is not None:
+            self.pseudo_costs = state['pseudo_costs']
+            self.pseudo_costs.reliability = reliability
+        self.pending_pseudo_cost = None  # (vertex, direction, parent bound, change of x) of the child being entered
+        self.strong_candidates = strong_candidates  # strong branching: candidates per node, dual simplex iterations
+        self.strong_iterations = strong_iterations
+        self.branching_stats = {'strong_branchings': 0}
+        self.reduced_master_problem = None
+        self.preprocess()
+
+        # subgraphs of the preprocessed graph solved as independent problems, see solve_components
+        self.processes = processes
+        self.decomposition = decomposition
+        self.components = []  # (bound, vertices, vertex forced into the clique or None)
+        self.component_stats = {'components': 0, 'components_skipped': 0, 'component_nodes': 0}
+        if decomposition == 'components':
+            components = components_by_bound(self.graph)
+            if len(components) > 1:
+                self.components = [(bound, nodes, None) for bound, nodes in components]
+        elif decomposition == 'degeneracy':  # used even if no subproblem is left, the incumbent is optimal then
+            self.components = later_neighbourhoods(self, self.current_maximum_clique_len)
+        self.decomposed = bool(self.components) or decomposition == 'degeneracy'
+        if state is not None:  # the interrupted run's kind of search goes on, whatever peeling gives now
+            self.components = state['components'] or []
+            self.decomposed = state['components'] is not None
+        self.component_position = 0  # components before it are solved or skipped
+        self.open_components = []  # components left open by the deadline, with their open bound
+        self.component_stats['components'] = len(self.components)
+
+        # orbital branching: automorphisms of the preprocessed graph, the x = 0 child of a branching
+        # fixes the whole orbit of the branching vertex under those that keep the node's fixings
+        self.generators = []
+        self.symmetry_stats = {'generators': 0, 'symmetry_complete': False, 'symmetry_time': 0.0,
+                               'orbital_fixings': 0}
+        if not self.decomposed and symmetry_time:
+            start = time.time()
+            self.generators, self.symmetry_stats['symmetry_complete'] = automorphisms(self, symmetry_time)
+            self.symmetry_stats['generators'] = len(self.generators)
+            self.symmetry_stats['symmetry_time'] = time.time() - start
+
+        if not self.decomposed:
+            self.get_ind_sets()
+            self.reduced_master_problem = self.construct_reduced_master_problem()
+
+        # open nodes (fixed_zero, fixed_one, parent bound) solved one by one by solve_open_nodes,
+        # the root unless resumed; None - the search starts at the root without a queue
+        self.start_nodes = None
+        self.node_queue = []  # nodes of start_nodes not yet entered
+        if checkpoint is not None and not self.decomposed:
+            self.start_nodes = [(0, 0, float(graph.number_of_nodes()))]
+            if state is not None:
+                self.restore_cuts(state['cuts'])
+                self.start_nodes = state['nodes']
         self.mwis_problem = None
         self.current_obj_values = []
 
@@ -36,10 +183,12 @@ class branch_and_cut:
                       nx.coloring.strategy_saturation_largest_first]
 
         for strategy in strategies:
+            if self.ind_sets and self.deadline is not None and self.deadline.expired():
+                break  # one colouring covers every vertex already
             d = nx.coloring.greedy_color(self.graph, strategy=strategy)  # return dict (keys - nodes, values - color)
             for color in set(color for node, color in d.items()):
-                self.ind_sets.append(
-                    [key for key, value in d.items() if value == color])
+                self.ind_sets.append(lift_independent_set(
+                    self, [key for key, value in d.items() if value == color]))
         # self.min_coloring = min(self.ind_sets, key=lambda x: len(x))
 
     def construct_reduced_master_problem(self):
@@ -55,8 +204,9 @@ class branch_and_cut:
         ...\n
         0 <= xn <= 1\n
 
+        lp_backend: 'simplex' (clique_simplex, warm started dual simplex) or 'cplex'
         '''
-        problem = cplex.Cplex()
+        problem = clique_simplex() if self.lp_backend == 'simplex' else cplex.Cplex()
         problem.objective.set_sense(problem.objective.sense.maximize)
 
         obj = [1.0] * len(self.nodes)
@@ -70,15 +220,17 @@ class branch_and_cut:
         problem.set_error_stream(None)
 
         problem.variables.add(obj=obj, ub=upper_bounds, names=columns_names, types=types)
+        self.register_deadline(problem)
 
-        constraints = []
+        rows = []
+        for key, ind_set in enumerate(self.ind_sets):
+            rows.extend(self.cut_pool.add('c{0}'.format(key), ind_set)[0])
+        rows = [(name, ind_set) for name, ind_set in rows if name in self.cut_pool.cuts]  # drop replaced ones
 
-        for ind_set in self.ind_sets:
-            constraints.append([[str(x) for x in ind_set], [1.0] * len(ind_set)])
-        ind_sets_len = len(self.ind_sets)
-        right_hand_side = [1.0] * ind_sets_len
-        constraint_names = ['c{0}'.format(key) for key, value in enumerate(self.ind_sets)]
-        constraint_senses = ['L'] * ind_sets_len
+        constraints = [[[str(x) for x in ind_set], [1.0] * len(ind_set)] for name, ind_set in rows]
+        right_hand_side = [1.0] * len(rows)
+        constraint_names = [name for name, ind_set in rows]
+        constraint_senses = ['L'] * len(rows)
 
         problem.linear_constraints.add(lin_expr=constraints,
                                        senses=constraint_senses,
@@ -86,51 +238,321 @@ class branch_and_cut:
                                        names=constraint_names)
         return problem
 
-    def filter_solution(self, solution):
-        return list(map(lambda x: x[0], filter(lambda x: x[1] == 1, enumerate(solution, start=1))))
+    def register_deadline(self, problem):
+        '''
+        The LP engine checks the deadline during solves (CPLEX by an abort callback),
+        so that a running simplex stops also when the deadline is cancelled
+        '''
+        if self.deadline is None:
+            return
+        if self.lp_backend == 'cplex':
+            problem.register_callback(deadline_callback).deadline = self.deadline
+        else:
+            problem.deadline = self.deadline
 
     def get_branching_variable(self):
-        def is_integer_weight(_pair):
-            return not _pair[0].is_integer()
-
-        def get_first_element(_pair):
-            return _pair[0]
-
-        def nvl(_seq):
-            return [(None, None)] if len(_seq) < 1 else _seq
-
-        return max(
-            nvl(list(
-                filter(is_integer_weight, zip(self.clique_candidates_weights, self.clique_candidates))
-            )),
-            key=get_first_element
-        )[1]
-
-    def add_constraint(self, constraints, rhs, name, sense='L'):
-        num_constraints = len(constraints)
-        constraints = [str(x) for x in constraints]
-        self.reduced_master_problem.linear_constraints.add(lin_expr=[[constraints, [1.0] * num_constraints]],
-                                                           senses=[sense],
-                                                           rhs=[rhs],
-                                                           names=[name])
+        candidates = [(weight, v) for weight, v in zip(self.clique_candidates_weights, self.clique_candidates)
+                      if not weight.is_integer()]
+        if not candidates:
+            return None
+        return BRANCHING_RULES[self.branching_rule](self, candidates)
+
+    def child_pseudo_cost(self, bvar, value):
+        '''
+        returns pending_pseudo_cost of the child bvar = value of the current node:
+        the first LP of that child updates the pseudo-costs of bvar
+        '''
+        x = dict(zip(self.clique_candidates, self.clique_candidates_weights)).get(int(bvar), 0.0)
+        return int(bvar), int(value), self.current_obj_sum, x if not value else 1.0 - x
+
+    def add_rows(self, rows):
+        '''
+        Adds pooled rows [(name, vertices)] to RMP in one call
+        '''
+        if rows:
+            rows = [(name, [x for x in ind_set if self.is_alive(x)]) for name, ind_set in rows]
+            self.reduced_master_problem.linear_constraints.add(
+                lin_expr=[[[str(x) for x in ind_set], [1.0] * len(ind_set)] for name, ind_set in rows],
+                senses=['L'] * len(rows),
+                rhs=[self.cut_pool.rhs[name] for name, ind_set in rows],
+                names=[name for name, ind_set in rows])
+
+    def add_cuts(self, cuts):
+        '''
+        Adds rows sum of vertices <= rhs [(vertices, name) or (vertices, name, rhs)], rhs is 1 for
+        independent sets, to RMP and to cut pool, skipping duplicates and sets dominated by a pooled row;
+        rows dominated by a new set leave RMP
+        returns names of rows RMP got
+        '''
+        rows = []
+        delete = []
+        for cut in cuts:
+            new_rows, dominated = self.cut_pool.add(cut[1], *cut[:1] + cut[2:])
+            rows.extend(new_rows)
+            delete.extend(dominated)
+        added = set(name for name, ind_set in rows)
+        delete = [name for name in delete if name not in added]
+        rows = [(name, ind_set) for name, ind_set in rows if name in self.cut_pool.cuts]
+        if delete:
+            self.reduced_master_problem.linear_constraints.delete(delete)
+        self.add_rows(rows)
+        return [name for name, ind_set in rows]
+
+    def add_cut(self, ind_set, name):
+        return bool(self.add_cuts([(ind_set, name)]))
+
+    def age_cuts(self):
+        '''
+        Purges pooled rows which had positive slack for cut_pool.max_age consecutive LP solves
+        '''
+        linear_constraints = self.reduced_master_problem.linear_constraints
+        purge = self.cut_pool.update(linear_constraints.get_names(),
+                                     self.reduced_master_problem.solution.get_linear_slacks(),
+                                     self.precision)
+        if purge:
+            linear_constraints.delete(purge)
+
+    def separate(self):
+        '''
+        Adds violated rows to RMP, trying cut families from the cheapest:
+        pooled cuts, independent sets (heuristics, then exact), odd holes of the complement
+        returns True if at least one row was added
+        '''
+        weights = dict(zip(self.clique_candidates, self.clique_candidates_weights))
+        pooled = self.cut_pool.violated(weights, self.precision)
+        if pooled:
+            self.separation_stats['pool_rounds'] += 1
+            self.add_rows(pooled)
+            return True
+
+        separated = violated_independent_sets(self, self.cut_batch, self.ls_perturbations)
+        if not separated:  # heuristic failed, look for the most violated set exactly
+            self.separation_stats['exact_calls'] += 1
+            ind_set, weight, proved = exact_mwis(self, self.exact_nodes, self.exact_time)
+            if not proved:
+                self.separation_stats['exact_incomplete'] += 1
+            if weight > 1 + self.precision:
+                self.separation_stats['exact_cuts'] += 1
+                separated = [(ind_set, weight)]
+
+        cuts = []
+        for ind_set, weight in separated:
+            self.mwis_counter += 1
+            lifted = lift_independent_set(self, ind_set)
+            self.separation_stats['lifted_vertices'] += len(lifted) - len(ind_set)
+            cuts.append((lifted, 'MWIS_{}_{}'.format(self.branch_num, self.mwis_counter)))
+        self.last_batch = self.add_cuts(cuts)
+        self.separation_stats['independent_set_cuts'] += len(self.last_batch)
+        if self.last_batch:
+            return True
+
+        self.separation_stats['odd_hole_calls'] += 1
+        cuts = []
+        for cycle, rhs in odd_hole_cuts(self, self.cut_batch):
+            self.mwis_counter += 1
+            cuts.append((cycle, 'ODD_{}_{}'.format(self.branch_num, self.mwis_counter), rhs))
+        self.last_batch = self.add_cuts(cuts)
+        self.separation_stats['odd_hole_cuts'] += len(self.last_batch)
+        return bool(self.last_batch)
+
+    def adapt_cut_batch(self):
+        '''
+        Doubles the batch size if every cut of the last batch is tight, halves it if most are slack
+        '''
+        batch = [name for name in self.last_batch if name in self.cut_pool.age]  # still in RMP
+        if not batch:
+            return
+        slacks = self.reduced_master_problem.solution.get_linear_slacks(batch)
+        tight = len([slack for slack in slacks if slack <= self.precision])
+        if tight == len(slacks):
+            self.cut_batch = min(self.cut_batch * 2, self.max_cut_batch)
+        elif 2 * tight < len(slacks):
+            self.cut_batch = max(self.cut_batch // 2, 1)
+        self.last_batch = []
+
+    def tailing_off(self, bounds, times):
+        '''
+        bounds: LP bound after each round of the node (first one before cuts), times: seconds of each round
+        '''
+        if len(times) < self.tail_window:
+            return False
+        start = bounds[-1 - self.tail_window]
+        gain = (start - bounds[-1]) / max(abs(start), 1.0)
+        spent = sum(times[-self.tail_window:])
+        return gain < self.tail_gain or (spent > 0 and gain / spent < self.tail_rate)
+
+    def cut_loop(self):
+        '''
+        Separation rounds at the current node until no cut is violated, the node is pruned,
+        the depth-dependent round limit is reached or the bound tails off
+        returns False if RMP became infeasible
+        '''
+        max_rounds = max(self.min_cut_rounds, int(self.root_cut_rounds * self.cut_round_decay ** self.depth))
+        bounds = [self.current_obj_sum]
+        times = []
+        by_depth = self.rounds_by_depth.setdefault(self.depth, [0, 0.0])
+
+        while self.current_obj_sum > self.current_maximum_clique_len:
+            if self.out_of_time():
+                break
+            if len(times) >= max_rounds:
+                self.cut_loop_stats['round_limit_stops'] += 1
+                break
+            round_start = time.time()
+            if not self.separate():
+                break
+            if not self.solve_rmp():
+                return False
+            self.adapt_cut_batch()
+
+            elapsed = time.time() - round_start
+            times.append(elapsed)
+            bounds.append(self.current_obj_sum)
+            self.cut_loop_stats['cut_rounds'] += 1
+            self.cut_loop_stats['cut_time'] += elapsed
+            self.cut_loop_stats['max_round_time'] = max(self.cut_loop_stats['max_round_time'], elapsed)
+            by_depth[0] += 1
+            by_depth[1] += elapsed
+
+            if self.tailing_off(bounds, times):
+                self.cut_loop_stats['tailing_off_stops'] += 1
+                break
+        return True
+
+    def out_of_time(self):
+        '''
+        Cooperative deadline check of the node loop, the cut loop and the combinatorial engine;
+        the first time it fails, the bounds of everything left open are recorded
+        '''
+        if not self.timed_out and self.deadline is not None and self.deadline.expired():
+            self.timed_out = True
+            if self.decomposed:  # bounds of the subproblems not solved, node_bound is of the whole graph
+                self.timeout_bound = max([component[0] for component in
+                                          self.open_components + self.components[self.component_position:]] + [0])
+            else:
+                self.timeout_bound = max([bound for zeros, ones, bound in self.open_children + self.node_queue] +
+                                         [self.node_bound])
+            if self.checkpoint is not None:
+                self.save_checkpoint()
+        return self.timed_out
+
+    def add_open_bound(self, bound):
+        if bound is not None:
+            self.extra_bound = bound if self.extra_bound is None else max(self.extra_bound, bound)
+
+    def upper_bound(self):
+        '''
+        Global upper bound on the clique number: the incumbent size once the search finished,
+        otherwise also the bounds of the nodes left open when time ran out
+        '''
+        bounds = [self.current_maximum_clique_len]
+        if self.timed_out:
+            bounds.append(self.timeout_bound)
+        if self.extra_bound is not None:
+            bounds.append(self.extra_bound)
+        return int(math.floor(max(bounds) + self.precision))
+
+    def result(self):
+        '''
+        returns (best clique, upper bound, relative gap)
+        '''
+        upper_bound = self.upper_bound()
+        gap = (upper_bound - self.current_maximum_clique_len) / float(upper_bound) if upper_bound else 0.0
+        return self.current_max_clique, upper_bound, gap
+
+    def save_checkpoint(self, done=False):
+        '''
+        Writes the search state to the checkpoint file: incumbent, cut pool, pseudo-costs and
+        the open nodes - the current one, the x = 1 children still to come on its path, the queue
+        and raced children left open - or the subproblems left open or not reached yet;
+        done - the search has no current node any more
+        '''
+        nodes = components = None
+        if self.decomposed:
+            components = self.open_components + self.components[self.component_position:]
+        else:
+            nodes = [] if done else ([(self.fixed_zero, self.fixed_one, self.node_bound)] +
+                                     self.open_children[::-1] + self.node_queue)
+            nodes += self.left_open
+        write_checkpoint(self.checkpoint, {'graph': self.graph_digest,
+                                           'incumbent': self.current_max_clique,
+                                           'nodes': nodes,
+                                           'components': components,
+                                           'cuts': self.cut_pool.snapshot(),
+                                           'pseudo_costs': self.pseudo_costs})
+        self.next_checkpoint = time.time() + self.checkpoint_interval
+
+    def restore_cuts(self, cuts):
+        '''
+        Puts the pooled cuts of a checkpoint [(vertices, rhs)] into the pool as inactive ones, separation
+        brings them back to RMP once violated (a cold LP with all rows of a long search is much slower)
+        '''
+        names = []
+        delete = []
+        for key, (vertices, rhs) in enumerate(cuts):
+            names.append('resumed_{0}'.format(key))
+            delete.extend(self.cut_pool.add(names[-1], vertices, rhs)[1])
+        self.cut_pool.deactivate(names)
+        in_rmp = set(self.reduced_master_problem.linear_constraints.get_names())
+        delete = [name for name in delete if name in in_rmp]  # replaced by a superset from the checkpoint
+        if delete:
+            self.reduced_master_problem.linear_constraints.delete(delete)
+
+    def statistics(self):
+        clique, upper_bound, gap = self.result()
+        stats = {'nodes': self.branch_num,
+                 'upper_bound': upper_bound,
+                 'gap': gap,
+                 'timed_out': self.timed_out,
+                 'lp_solves': self.lp_solves,
+                 'lp_time': self.lp_time}
+        stats.update(self.cut_pool.statistics())
+        stats.update(self.separation_stats)
+        stats.update(self.cut_loop_stats)
+        stats.update(self.heuristic_stats)
+        stats.update(self.preprocessing_stats)
+        stats.update(self.component_stats)
+        stats.update(self.node_stats)
+        stats.update(self.mcq_stats)
+        stats.update(self.race_stats)
+        stats.update(self.branching_stats)
+        stats.update(self.symmetry_stats)
+        stats['rounds_by_depth'] = dict((depth, (rounds, round(seconds, 3)))
+                                        for depth, (rounds, seconds) in self.rounds_by_depth.items())
+        return stats
 
     def solve_rmp(self):
         try:
+            lp_start = time.time()
+            self.lp_solves += 1
+            remaining = self.deadline.remaining() if self.deadline is not None else None
+            if remaining is not None and self.lp_backend == 'cplex':
+                self.reduced_master_problem.parameters.timelimit.set(max(remaining, 1e-3))
             self.reduced_master_problem.solve()
+            self.lp_time += time.time() - lp_start
 
-            if self.reduced_master_problem.solution.get_status() != 101:  # An optimal integer solution has been found
+            status = self.reduced_master_problem.solution.get_status()
+            if status in (11, 13):  # aborted by the time limit or the deadline callback
+                self.out_of_time()
+                raise cplex.exceptions.CplexSolverError
+            if status not in (1, 101):  # optimal (LP) / optimal integer solution
                 print(self.reduced_master_problem.solution.get_status())
                 print(self.reduced_master_problem.solution.get_status_string())
                 raise cplex.exceptions.CplexSolverError
 
+            self.lp_stale = False
             self.current_obj_values = self.reduced_master_problem.solution.get_values()
             self.current_obj_sum = sum(self.current_obj_values)
+            self.node_bound = min(self.node_bound, self.current_obj_sum)
             self.clique_candidates = []
             self.clique_candidates_weights = []
             for value, name in zip(self.current_obj_values, self.reduced_master_problem.variables.get_names()):
                 if value - self.precision > 0:  # solver value- 1*10^-5
                     self.clique_candidates.append(int(name))
                     self.clique_candidates_weights.append(value)
+                    if value + self.precision < 1:
+                        self.fractional_count[self.bit_index[int(name)]] += 1
+            self.age_cuts()
             return True
 
         except cplex.exceptions.CplexSolverError:
@@ -140,22 +562,269 @@ class branch_and_cut:
             self.clique_candidates_weights = []
             return False
 
-    def delete_branch(self, name):
-        self.reduced_master_problem.linear_constraints.delete(name)
+    def preprocess(self):
+        '''
+        Peels vertices (and edges) which cannot be in a clique larger than the incumbent,
+        removing their LP columns; reruns whenever the incumbent improves
+        returns removed vertices
+        '''
+        if not self.peeling:
+            return []
+        self.preprocessing_stats['peel_runs'] += 1
+        removed, removed_edges = peel(self, self.current_maximum_clique_len, self.peeling == 'edges')
+        self.preprocessing_stats['peeled_vertices'] += len(removed)
+        self.preprocessing_stats['peeled_edges'] += removed_edges
+        if removed and self.reduced_master_problem is not None:
+            self.reduced_master_problem.variables.delete([str(v) for v in removed])
+            self.lp_stale = True
+        return removed
 
-    def branching(self, bvar):
-        branch_num = self.branch_num
+    def node_candidates(self):
+        '''
+        returns bitset of the vertices which can extend the vertices fixed to 1 at this node,
+        None if those are no longer a clique of alive vertices
+        '''
+        adj_bits = self.adj_bits
+        ones = self.fixed_one
+        if ones & ~self.alive_mask:  # a vertex fixed to 1 was peeled meanwhile
+            return None
+        candidates = self.alive_mask & ~self.fixed_zero & ~ones
+        for i in iter_bits(ones):
+            if ones & ~adj_bits[i] & ~(1 << i):  # vertices fixed to 1 are not a clique
+                return None
+            candidates &= adj_bits[i]
+        return candidates
+
+    def colouring_bound(self, candidates):
+        '''
+        Greedy colouring of the node candidates;
+        with node_colouring 'rows' its classes (lifted) go to RMP as independent-set rows
+        returns False if the node cannot beat the incumbent
+        '''
+        fixed = bin(self.fixed_one).count('1')
+        if fixed + bin(candidates).count('1') <= self.current_maximum_clique_len:
+            self.node_stats['colouring_pruned'] += 1
+            return False
+        classes = colour_classes(self, candidates)
+        self.node_bound = min(self.node_bound, fixed + len(classes))
+        if fixed + len(classes) <= self.current_maximum_clique_len:
+            self.node_stats['colouring_pruned'] += 1
+            return False
+
+        if self.node_colouring == 'rows':
+            cuts = []
+            for colour in classes:
+                if colour & (colour - 1):  # at least two vertices
+                    vertices = lift_independent_set(self, [self.order[i] for i in iter_bits(colour)])
+                    cuts.append((vertices, 'COL_{0}_{1}'.format(self.branch_num, len(cuts))))
+            self.node_stats['colour_rows'] += len(self.add_cuts(cuts))
+        return True
+
+    def hand_off(self, candidates):
+        '''
+        Hybrid policy: True if the node is small or sparse enough for the combinatorial engine
+        '''
+        n = bin(candidates).count('1')
+        if n <= self.mcq_vertices:
+            return True
+        if self.mcq_density:
+            edges = sum(bin(self.adj_bits[i] & candidates).count('1') for i in iter_bits(candidates)) / 2
+            return edges <= self.mcq_density * n * (n - 1) / 2
+        return False
+
+    def solve_combinatorial(self, candidates):
+        '''
+        Solves the node by the combinatorial engine, sharing the incumbent
+        '''
+        self.mcq_stats['mcq_calls'] += 1
+        best = self.current_maximum_clique_len
+        self.mcq_stats['mcq_nodes'] += max_clique(self, candidates, self.fixed_one)
+        if self.current_maximum_clique_len > best:
+            self.mcq_stats['mcq_improvements'] += 1
+        return self.current_max_clique
+
+    def is_alive(self, var):
+        return self.alive_mask >> self.bit_index[int(var)] & 1
+
+    def fix_variable(self, var, value):
+        '''
+        Fixes var to value by its bounds (warm start friendly), returns previous bounds
+        '''
+        variables = self.reduced_master_problem.variables
+        bounds = variables.get_lower_bounds(var), variables.get_upper_bounds(var)
+        variables.set_lower_bounds(var, value)
+        variables.set_upper_bounds(var, value)
+        return bounds
+
+    def restore_variable(self, var, bounds):
+        if not self.is_alive(var):  # column was peeled meanwhile
+            return
+        variables = self.reduced_master_problem.variables
+        variables.set_lower_bounds(var, bounds[0])
+        variables.set_upper_bounds(var, bounds[1])
 
-        self.add_constraint([bvar], 0.0, 'branch_{}_{}'.format(branch_num, 0), sense='E')
+    def child_fixings(self, bvar, value):
+        '''
+        Vertices fixed to value in the child bvar = value: the orbit of bvar in the x = 0 child
+        (any clique through another vertex of the orbit has a symmetric copy through bvar)
+        '''
+        v = int(bvar)
+        if value or not self.generators:
+            return [v]
+        orbit_mask = orbit(self.generators, self.bit_index[v], (self.fixed_zero, self.fixed_one))
+        vertices = [self.order[i] for i in iter_bits(orbit_mask & self.alive_mask & ~self.fixed_zero)]
+        self.symmetry_stats['orbital_fixings'] += len(vertices) - 1
+        return vertices
+
+    def fix_vertices(self, vertices, value):
+        '''
+        Fixes vertices to value for a child node, returns fixings for unfix_vertices
+        '''
+        fixed = []
+        for v in vertices:
+            var = str(v)
+            bit = 1 << self.bit_index[v]
+            if value:
+                self.fixed_one |= bit
+            else:
+                self.fixed_zero |= bit
+            fixed.append((var, self.fix_variable(var, value), bit))
+        self.depth += 1
+        return fixed
+
+    def unfix_vertices(self, fixed):
+        for var, bounds, bit in fixed:
+            self.fixed_zero &= ~bit
+            self.fixed_one &= ~bit
+            self.restore_variable(var, bounds)
+        self.depth -= 1
+
+    def solve_child(self, index, bvar, value, results):
+        '''
+        Process target of race_children: solves the child bvar = value on the forked copy of the
+        solver, puts (index, (clique, search nodes, races, (fixed_zero, fixed_one, bound left open or None),
+        error)) to results
+        '''
+        _reset_signals()
+        try:
+            self.checkpoint = None  # the racing parent writes the checkpoints
+            if self.lp_backend == 'cplex':  # own CPLEX problem object instead of the forked one
+                self.reduced_master_problem = cplex.Cplex(self.reduced_master_problem)
+                self.register_deadline(self.reduced_master_problem)
+            before = self.branch_num, self.race_stats['races']
+            self.pending_pseudo_cost = self.child_pseudo_cost(bvar, value)
+            self.fix_vertices(self.child_fixings(bvar, value), value)
+            node = self.fixed_zero, self.fixed_one
+            clique = self.solve
+            open_bound = self.upper_bound() if self.timed_out or self.extra_bound is not None else None
+            results.put((index, (clique, self.branch_num - before[0], self.race_stats['races'] - before[1],
+                                 node + (open_bound,), None)))
+        except Exception as error:
+            results.put((index, ([], 0, 0, (0, 0, None), repr(error))))
+
+    def race_children(self, bvar):
+        '''
+        Solves both children of bvar concurrently, each in a forked process with its own
+        copy of the solver and LP; the incumbent goes through shared memory, so the side
+        that improves it tightens pruning in the other immediately. A child left open by the
+        deadline goes to left_open with its bound, one that dies without a result, or is stuck past
+        the deadline, with the bound of the parent
+        '''
+        self.race_stats['races'] += 1
+        if self.shared is None:
+            self.shared = shared_incumbent(len(self.order))
+            self.shared.publish(self.current_max_clique)
+        parent_bound = self.node_bound
+        results = multiprocessing.Queue()
+        values = [0.0, 1.0] if self.is_alive(bvar) else [0.0]
+        workers = [multiprocessing.Process(target=self.solve_child, args=(index, bvar, value, results))
+                   for index, value in enumerate(values)]
+        errors = []
+        try:
+            for worker in workers:
+                worker.start()
+            for index, result in collect(results, workers, self.deadline):
+                if result is None:
+                    self.race_stats['dead_children'] += 1
+                    bit = 1 << self.bit_index[int(bvar)]
+                    self.left_open.append((self.fixed_zero | bit, self.fixed_one, parent_bound) if not values[index]
+                                          else (self.fixed_zero, self.fixed_one | bit, parent_bound))
+                    self.add_open_bound(parent_bound)
+                    continue
+                clique, nodes, races, (zeros, ones, open_bound), error = result
+                if error is not None:
+                    errors.append(error)
+                self.update_incumbent(clique)
+                if open_bound is not None:
+                    self.left_open.append((zeros, ones, open_bound))
+                    self.add_open_bound(open_bound)
+                self.branch_num += nodes
+                self.race_stats['races'] += races
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+        if errors:
+            raise RuntimeError('child solve failed: ' + '; '.join(errors))
+        self.sync_incumbent()
+        return self.current_max_clique
+
+    def branching(self, bvar):
+        if self.depth < self.race_depth:
+            return self.race_children(bvar)
+        up_child = self.child_pseudo_cost(bvar, 1.0)
+        self.pending_pseudo_cost = self.child_pseudo_cost(bvar, 0.0)
+        parent_bound = self.node_bound
+        # covers the x = 1 child until it starts
+        self.open_children.append((self.fixed_zero, self.fixed_one | 1 << self.bit_index[int(bvar)], parent_bound))
+        self.node_bound = parent_bound
+        fixed = self.fix_vertices(self.child_fixings(bvar, 0.0), 0.0)
         branch_2 = self.solve
-        self.delete_branch('branch_{}_{}'.format(branch_num, 0))
+        self.unfix_vertices(fixed)
+        self.open_children.pop()
 
-        self.add_constraint([bvar], 1.0, 'branch_{}_{}'.format(branch_num, 1), sense='E')
-        branch_1 = self.solve
-        self.delete_branch('branch_{}_{}'.format(branch_num, 1))
+        branch_1 = []
+        # a peeled vertex is in no clique larger than the incumbent
+        if self.is_alive(bvar):
+            # the deadline is checked inside the child: past it the child is the open current node
+            self.pending_pseudo_cost = up_child
+            self.node_bound = parent_bound
+            fixed = self.fix_vertices([int(bvar)], 1.0)
+            branch_1 = self.solve
+            self.unfix_vertices(fixed)
 
         return max(branch_1, branch_2, key=lambda x: len(x))
 
+    def update_incumbent(self, clique):
+        if len(clique) > self.current_maximum_clique_len:
+            self.current_maximum_clique_len = len(clique)
+            self.current_max_clique = clique
+            if self.shared is not None:
+                self.shared.publish(clique)
+            self.preprocess()
+            return True
+        return False
+
+    def sync_incumbent(self):
+        '''
+        Adopts a larger clique found by a concurrent solver
+        '''
+        if self.shared is not None:
+            clique = self.shared.fetch(self.current_maximum_clique_len)
+            if clique is not None:
+                self.update_incumbent(clique)
+
+    def round_lp(self):
+        '''
+        Runs LP-guided rounding on the current LP solution, returns True if the incumbent improved
+        '''
+        self.heuristic_stats['rounding_calls'] += 1
+        if self.update_incumbent(lp_rounding(self, self.rounding_steps)):
+            self.heuristic_stats['rounding_improvements'] += 1
+            return True
+        return False
+
     def check_clique(self):
         subgraph = self.graph.subgraph(self.clique_candidates)
         for node1 in subgraph.nodes:
@@ -165,72 +834,312 @@ class branch_and_cut:
                         return False
         return True
 
-    @property
-    def solve(self):
+    def solve_components(self):
+        '''
+        Solves subgraphs of the preprocessed graph (connected components or later neighbourhoods
+        of the degeneracy order) as independent problems with their own RMPs, largest bound first
+        (in a process pool if processes > 1); subgraphs whose bound does not beat the incumbent are skipped
+        '''
+        options = dict(self.options, processes=1, checkpoint=None, resume=False)
+        if self.processes > 1:  # pool workers are daemonic and cannot fork racing children
+            options['race_depth'] = 0
+        if self.decomposition == 'degeneracy':
+            # the subproblems are small and the incumbent comes from the whole graph,
+            # connected components are still split off after their peeling
+            options.update(decomposition='components', heuristic_time=0.0)
 
-        self.branch_num += 1
+        if self.processes > 1:
+            components = []
+            for component in self.components:
+                if component[0] <= self.current_maximum_clique_len:
+                    self.component_stats['components_skipped'] += 1
+                else:
+                    components.append(component)
+            tasks = [(self.graph.subgraph(nodes).copy(), self.current_max_clique, dict(options, deadline=None), root)
+                     for bound, nodes, root in components]
+            pool = multiprocessing.Pool(self.processes, _init_component_worker, (self.deadline,))
+            try:
+                results = pool.map(solve_component, tasks)
+            finally:
+                pool.close()
+                pool.join()
+            # a subproblem stopped before its root LP has the bound of its whole graph, the colouring one is better
+            results = [(clique, nodes, None if open_bound is None else min(open_bound, bound))
+                       for (clique, nodes, open_bound), (bound, vertices, root) in zip(results, components)]
+            self.component_position = len(self.components)
+            self.open_components = [(result[2], vertices, root) for result, (bound, vertices, root)
+                                    in zip(results, components) if result[2] is not None]
+        else:
+            # component_position moves past solved and skipped subgraphs, a checkpoint keeps the rest
+            results = []
+            while self.component_position < len(self.components) and not self.out_of_time():
+                bound, nodes, root = self.components[self.component_position]
+                if bound <= self.current_maximum_clique_len:  # also if the incumbent improved meanwhile
+                    self.component_stats['components_skipped'] += 1
+                else:
+                    if self.checkpoint is not None and time.time() >= self.next_checkpoint:
+                        self.save_checkpoint()
+                    clique, searched, open_bound = solve_component((self.graph.subgraph(nodes).copy(),
+                                                                    self.current_max_clique, options, root))
+                    self.update_incumbent(clique)
+                    if open_bound is not None:  # left open by the deadline
+                        open_bound = min(open_bound, bound)
+                        self.open_components.append((open_bound, nodes, root))
+                    results.append((clique, searched, open_bound))
+                self.component_position += 1
+            for component in self.components[self.component_position:]:
+                self.add_open_bound(component[0])
 
-        if not self.solve_rmp():
-            return []
+        for clique, nodes, open_bound in results:
+            self.update_incumbent(clique)
+            self.add_open_bound(open_bound)
+            self.component_stats['component_nodes'] += nodes
+        if self.checkpoint is not None:  # the final state: what is left open, or nothing
+            self.save_checkpoint()
+        return self.current_max_clique
 
-        if self.current_obj_sum <= self.current_maximum_clique_len:
-            return self.current_max_clique
+    def process_node(self):
+        '''
+        Bounds the current node: colouring, hand-off to the combinatorial engine,
+        LP with cut loop and rounding
+        returns (best clique, None) if the node is done, (None, branching variable) otherwise
+        '''
+        self.branch_num += 1
+        self.sync_incumbent()
+        if self.shared is not None and self.shared.proved():
+            return self.current_max_clique, None
+        if self.out_of_time():
+            return self.current_max_clique, None
+        if self.checkpoint is not None and time.time() >= self.next_checkpoint:
+            self.save_checkpoint()
 
-        mwis_counter = 0
-        mwis_solution = find_mwis(self)
-        mwis_weight_sum = sum([tpl_a[1] for tpl_a in mwis_solution])
+        candidates = self.node_candidates()
+        if candidates is None:
+            return [], None
+        if self.node_colouring and not self.colouring_bound(candidates):
+            return self.current_max_clique, None
+        pending, self.pending_pseudo_cost = self.pending_pseudo_cost, None
+        if self.hand_off(candidates):
+            return self.solve_combinatorial(candidates), None
 
-        prev_obj_sum = self.current_obj_sum
-        obj_sum_repeat = 0
+        if not self.solve_rmp():
+            return [], None
+        if pending is not None:
+            v, direction, parent_bound, change = pending
+            self.pseudo_costs.update(v, direction, parent_bound - self.current_obj_sum, change)
 
-        while mwis_weight_sum > 1 and self.current_obj_sum > self.current_maximum_clique_len and obj_sum_repeat < 20:
-            mwis_counter += 1
-            self.add_constraint([str(tpl_b[0]) for tpl_b in mwis_solution], 1.0,
-                                'MWIS_{}_{}'.format(self.branch_num, mwis_counter))
-            if not self.solve_rmp():
-                return []
+        if self.current_obj_sum <= self.current_maximum_clique_len:
+            return self.current_max_clique, None
 
-            mwis_solution = find_mwis(self)
-            mwis_weight_sum = sum([tpl_c[1] for tpl_c in mwis_solution])
+        self.mwis_counter = 0
+        if not self.cut_loop():
+            return [], None
 
-            if self.current_obj_sum - prev_obj_sum < 0.1:
-                obj_sum_repeat += 1
-            else:
-                obj_sum_repeat = 0
-            prev_obj_sum = self.current_obj_sum
+        if self.rounding_steps is not None:
+            self.round_lp()
+        if self.lp_stale and not self.solve_rmp():  # the incumbent improved and columns were peeled
+            return [], None
+        if self.current_obj_sum <= self.current_maximum_clique_len or self.out_of_time():
+            return self.current_max_clique, None
 
         branching_variable = self.get_branching_variable()
         if branching_variable is None:  # all weights are integer
             if self.check_clique():
-                if self.current_maximum_clique_len < len(self.clique_candidates):
-                    self.current_maximum_clique_len = len(self.clique_candidates)
-                    self.current_max_clique = self.clique_candidates
-                return self.current_max_clique
+                self.update_incumbent(self.clique_candidates)
+                return self.current_max_clique, None
             else:  # get all non-incidents nodes in clique candidates and add to constraint in rmp
                 inversed_cand_graph = nx.complement(self.graph.subgraph(self.clique_candidates))
                 for key, edge in enumerate(inversed_cand_graph.edges()):
-                    self.add_constraint(edge, 1.0, 'not_clique_{0}_{1}'.format(self.branch_num, key))
-                return self.solve
-        else:
-            return self.branching(str(branching_variable))
+                    self.add_cut(edge, 'not_clique_{0}_{1}'.format(self.branch_num, key))
+                return self.solve, None
+        return None, str(branching_variable)
+
+    def enter_node(self, zeros, ones, bound):
+        '''
+        Moves to the node given by its bound changes (vertices fixed to 0 and to 1) and its parent's bound
+        returns fixings for leave_node, None if a vertex fixed to 1 was peeled (nothing to gain there)
+        '''
+        self.node_bound = bound
+        fixed = []
+        for vertices, value in ((zeros, 0.0), (ones, 1.0)):
+            for v in vertices:
+                if not self.is_alive(v):
+                    if value:
+                        self.leave_node(fixed)
+                        return None
+                    continue
+                var = str(v)
+                bit = 1 << self.bit_index[v]
+                if value:
+                    self.fixed_one |= bit
+                else:
+                    self.fixed_zero |= bit
+                fixed.append((var, self.fix_variable(var, value)))
+        self.depth = len(fixed)
+        return fixed
+
+    def leave_node(self, fixed):
+        for var, bounds in fixed:
+            self.restore_variable(var, bounds)
+        self.fixed_zero = 0
+        self.fixed_one = 0
+        self.depth = 0
+
+    def tight_cuts(self):
+        '''
+        returns pooled rows with zero slack in the last LP solution as [(vertices, rhs)]
+        '''
+        linear_constraints = self.reduced_master_problem.linear_constraints
+        slacks = self.reduced_master_problem.solution.get_linear_slacks()
+        return [(tuple(self.cut_pool.cuts[name]), self.cut_pool.rhs[name])
+                for name, slack in zip(linear_constraints.get_names(), slacks)
+                if slack <= self.precision and name in self.cut_pool.cuts]
+
+    def solve_open_nodes(self):
+        '''
+        Top of a search with checkpoints: solves the open nodes of start_nodes one by one,
+        each with its whole subtree; once all are solved the final checkpoint keeps only
+        the raced children left open
+        '''
+        self.node_queue, self.start_nodes = self.start_nodes, None
+        while self.node_queue and not self.timed_out:
+            zeros, ones, bound = self.node_queue.pop(0)
+            fixed = self.enter_node([self.order[i] for i in iter_bits(zeros)],
+                                    [self.order[i] for i in iter_bits(ones)], bound)
+            if fixed is not None:
+                self.update_incumbent(self.solve)
+                self.leave_node(fixed)
+        if not self.timed_out:
+            self.save_checkpoint(done=True)
+        return self.current_max_clique
+
+    @property
+    def solve(self):
+        if self.decomposed:
+            return self.solve_components()
+        if self.start_nodes is not None:
+            return self.solve_open_nodes()
+
+        clique, branching_variable = self.process_node()
+        if branching_variable is None:
+            return self.current_max_clique if self.timed_out else clique
+        return self.branching(branching_variable)
+
+
+class deadline_callback(cplex.callbacks.SimplexCallback):
+    '''
+    Aborts a running CPLEX simplex once the deadline set on the registered instance passed
+    '''
+    deadline = None
+
+    def __call__(self):
+        if self.deadline is not None and self.deadline.expired():
+            self.abort()
+
+
+def solve_component(task):
+    '''
+    task: (graph, incumbent clique, branch_and_cut options, root adjacent to all of graph or None);
+    with a root only cliques of graph plus the root count, graph needs one smaller than the incumbent
+    returns (clique, number of search nodes, upper bound if the deadline left nodes open else None)
+    '''
+    graph, incumbent, options, root = task
+    if 'deadline' in _worker:  # pool worker, the deadline comes from _init_component_worker
+        options = dict(options, deadline=_worker['deadline'])
+    if root is not None:
+        incumbent = incumbent[:-1]
+    bnc = branch_and_cut(graph, incumbent=incumbent, **options)
+    clique = bnc.solve
+    open_bound = bnc.upper_bound() if bnc.timed_out or bnc.extra_bound is not None else None
+    if root is not None:  # the incumbent given is no clique of graph plus the root
+        clique = clique + [root] if all(v in graph for v in clique) else []
+        open_bound = None if open_bound is None else open_bound + 1
+    return clique, bnc.branch_num + bnc.component_stats['component_nodes'], open_bound
+
+
+def solve_configuration(graph, shared, **options):
+    '''
+    Portfolio worker, returns (clique, statistics)
+    '''
+    bnc = branch_and_cut(graph, shared=shared, **options)
+    clique = bnc.solve
+    return clique, bnc.statistics()
+
+
+def solve_portfolio(graph, processes=None, configurations=PORTFOLIO, **options):
+    '''
+    Races configurations (see parallel.PORTFOLIO) of branch_and_cut on graph in parallel
+    processes sharing the incumbent, the first one to finish wins
+    returns (clique, name of the winning configuration, its statistics)
+    '''
+    # checkpoints are for the sequential search only
+    configurations = [(name, dict(options, race_depth=0, checkpoint=None, resume=False, **config))
+                      for name, config in configurations]
+    return race(solve_configuration, graph, configurations, processes, deadline=options.get('deadline'))
+
+
+def solve_parallel(graph, processes, **options):
+    '''
+    Parallel tree search over processes workers (see parallel.tree_search)
+    returns (clique, statistics)
+    '''
+    options.update(checkpoint=None, resume=False)  # checkpoints are for the sequential search only
+    bnc = branch_and_cut(graph, shared=shared_incumbent(graph.number_of_nodes()), processes=processes, **options)
+    if bnc.decomposed:  # independent subproblems go to a process pool already
+        clique = bnc.solve
+        return clique, bnc.statistics()
+    # workers get the preprocessed graph and their incumbent from the master
+    worker_options = dict(bnc.options, decomposition=None, processes=1, heuristic_time=0.0, race_depth=0)
+    parallel_stats = tree_search(bnc, branch_and_cut, worker_options, processes)
+    statistics = bnc.statistics()
+    statistics.update(parallel_stats)
+    return bnc.current_max_clique, statistics
 
 
 @timing
-def solve_clique(graph):
-    clique = branch_and_cut(graph).solve
+def solve_clique(graph, stats=False, portfolio=False, parallel_search=False, **options):
+    if portfolio:
+        processes = options.pop('processes', None)
+        clique, winner, statistics = solve_portfolio(graph, processes if processes > 1 else None, **options)
+        print 'portfolio {0}: {1}'.format('best bound' if statistics['gap'] else 'winner', winner)
+    elif parallel_search:
+        clique, statistics = solve_parallel(graph, **options)
+    else:
+        bnc = branch_and_cut(graph, **options)
+        clique = bnc.solve
+        statistics = bnc.statistics()
+    if stats:
+        for key, value in sorted(statistics.items()):
+            print '{0}: {1}'.format(key, value)
+    if statistics['gap']:
+        print 'Timed out: clique {0}, upper bound {1}, gap {2:.2%}'.format(
+            len(clique), statistics['upper_bound'], statistics['gap'])
     return clique
 
 
 def main():
     args = arguments()
     graph = read_dimacs_graph(args.path)
-    try:
-        with time_limit(args.time):
-            clq = solve_clique(graph)
-            print len(clq[0])
-    except TimeoutException:
-        print("Timed out!")
-        sys.exit(0)
+    run_deadline = deadline(args.time)
+    # SIGTERM (e.g. preemption) ends the run like the time limit: cooperatively, with the best clique so far
+    signal.signal(signal.SIGTERM, lambda signum, frame: run_deadline.cancel())
+    clq = solve_clique(graph, stats=args.stats, portfolio=args.portfolio, deadline=run_deadline,
+                       parallel_search=args.parallel_search, lp_backend=args.lp, cut_max_age=args.cut_age,
+                       cut_batch=args.cut_batch, exact_nodes=args.exact_nodes, exact_time=args.exact_time,
+                       ls_perturbations=args.ls_perturbations, root_cut_rounds=args.root_cut_rounds,
+                       tail_gain=args.tail_gain, heuristic_time=args.heuristic_time,
+                       rounding_steps=args.rounding_steps,
+                       peeling=None if args.peeling == 'none' else args.peeling,
+                       decomposition=None if args.decomposition == 'none' else args.decomposition,
+                       processes=args.processes,
+                       node_colouring=None if args.node_colouring == 'none' else args.node_colouring,
+                       mcq_vertices=args.mcq_vertices, mcq_density=args.mcq_density,
+                       race_depth=args.race_depth, branching_rule=args.branching,
+                       reliability=args.reliability, strong_candidates=args.strong_candidates,
+                       strong_iterations=args.strong_iterations, symmetry_time=args.symmetry_time,
+                       checkpoint=args.checkpoint, checkpoint_interval=args.checkpoint_interval,
+                       resume=args.resume)
+    print len(clq[0])
 
 
 if __name__ == '__main__':
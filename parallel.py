@@ -0,0 +1,274 @@
+import heapq
+import itertools
+import multiprocessing
+import Queue
+import signal
+import time
+
+# configurations raced by the portfolio solver, options of branch_and_cut overriding the common ones
+PORTFOLIO = [
+    ('hybrid', {}),
+    ('branch_and_cut', {'mcq_vertices': 0, 'mcq_density': 0.0}),
+    ('combinatorial', {'mcq_vertices': 10 ** 9, 'node_colouring': 'bound'}),
+    ('heavy_preprocessing', {'heuristic_time': 5.0, 'decomposition': 'degeneracy'}),
+    ('light_separation', {'cut_batch': 16, 'exact_nodes': 2000, 'exact_time': 0.1, 'root_cut_rounds': 20}),
+]
+
+
+class shared_incumbent(object):
+    '''
+    Best clique known to any process and the global upper bound, in shared memory;
+    must reach worker processes by inheritance (as a Process or Pool initializer argument)
+    '''
+
+    def __init__(self, capacity):
+        self.size = multiprocessing.Value('i', 0)
+        self.vertices = multiprocessing.Array('l', max(capacity, 1), lock=False)
+        self.bound = multiprocessing.Value('d', capacity, lock=False)  # set by the tree search master
+
+    def set_bound(self, bound):
+        self.bound.value = bound
+
+    def proved(self):
+        '''
+        True if the shared clique is known to be optimal
+        '''
+        return self.size.value >= int(self.bound.value + 1e-6)
+
+    def publish(self, clique):
+        with self.size.get_lock():
+            if len(clique) > self.size.value:
+                self.vertices[:len(clique)] = [int(v) for v in clique]
+                self.size.value = len(clique)
+
+    def fetch(self, known):
+        '''
+        returns the shared clique if it is larger than known, otherwise None
+        '''
+        if self.size.value <= known:  # unlocked peek, cheap enough for every search node
+            return None
+        with self.size.get_lock():
+            return list(self.vertices[:self.size.value])
+
+
+def _reset_signals():
+    '''
+    Restores the default SIGTERM action in a worker process: the handler inherited from main()
+    cancels the deadline, terminate() must stop the worker instead
+    '''
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def collect(results, workers, deadline=None, grace=10.0):
+    '''
+    Yields the (index, result) pairs put to the queue results by the started worker processes
+    (index of the worker in workers) until every worker has put one; (index, None) for a worker
+    that exited without, killed (e.g. out of memory) or crashed in native code, or that still
+    runs grace seconds after the deadline passed or was cancelled (the caller terminates it)
+    '''
+    pending = set(range(len(workers)))
+    expired_at = None
+    while pending:
+        if expired_at is None and deadline is not None and deadline.expired():
+            expired_at = time.time()
+        try:
+            index, result = results.get(timeout=1.0)
+        except Queue.Empty:
+            overdue = expired_at is not None and time.time() >= expired_at + grace
+            for index in sorted(pending):
+                exitcode = workers[index].exitcode
+                # a result is flushed before a clean exit, the queue may still hold it
+                if overdue or exitcode or exitcode == 0 and results.empty():
+                    pending.discard(index)
+                    yield index, None
+            continue
+        if index in pending:
+            pending.discard(index)
+            yield index, result
+
+
+def _race_worker(solver, index, graph, options, shared, results):
+    _reset_signals()
+    try:
+        results.put((index, solver(graph, shared, **options)))
+    except Exception as error:
+        results.put((index, (None, repr(error))))
+
+
+def race(solver, graph, configurations, processes=None, shared=None, deadline=None):
+    '''
+    Runs solver(graph, shared, **options) -> (clique, statistics) for every (name, options)
+    of configurations in its own process (the first processes of them), the incumbent shared
+    through shared memory; all workers are stopped as soon as one of them proves its clique
+    optimal (gap 0). If all of them stop at the deadline instead, the one with the lowest upper
+    bound is reported, with the largest clique found by any of them; workers still running
+    well after the deadline passed (see collect) count as failed
+    returns (clique, name of the winning configuration, its statistics)
+    '''
+    if processes:
+        configurations = configurations[:processes]
+    if shared is None:
+        shared = shared_incumbent(graph.number_of_nodes())
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_race_worker, args=(solver, index, graph, options, shared, results))
+               for index, (name, options) in enumerate(configurations)]
+    try:
+        for worker in workers:
+            worker.daemon = True
+            worker.start()
+        finished = []  # (name, clique, statistics) of workers stopped by the deadline
+        errors = {}
+        stuck = []  # names of workers without a result well after the deadline
+        for index, result in collect(results, workers, deadline):
+            name = configurations[index][0]
+            if result is None:
+                if workers[index].exitcode is None:
+                    stuck.append(name)
+                else:
+                    errors[name] = 'exit code {0}'.format(workers[index].exitcode)
+                continue
+            clique, stats = result
+            if clique is None:
+                errors[name] = stats
+            elif not stats['gap']:
+                return clique, name, stats
+            else:
+                finished.append((name, clique, stats))
+        if not finished and not stuck:
+            raise RuntimeError('all portfolio configurations failed\n' +
+                               '\n'.join('{0}: {1}'.format(name, error) for name, error in sorted(errors.items())))
+        if not finished:  # all stuck past the deadline: the shared incumbent, without a bound
+            clique, bound = shared.fetch(0) or [], graph.number_of_nodes()
+            return clique, ', '.join(sorted(stuck)), {'upper_bound': bound, 'gap': (bound - len(clique)) / float(bound)}
+        name, clique, stats = min(finished, key=lambda result: (result[2]['upper_bound'], -len(result[1])))
+        best = max((result[1] for result in finished), key=len)
+        if len(best) > len(clique):
+            stats = dict(stats, gap=(stats['upper_bound'] - len(best)) / float(stats['upper_bound']))
+        return best, name, stats
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+
+_worker = {}  # state of a pool worker process: its own solver or the deadline
+
+
+def _init_component_worker(deadline):
+    '''
+    Pool initializer of the decomposition: the deadline is inherited, it cannot go with the tasks
+    '''
+    _reset_signals()
+    _worker['deadline'] = deadline
+
+
+def _init_tree_worker(factory, graph, options, shared):
+    _reset_signals()
+    if options.get('deadline') is not None and options['deadline'].expired():
+        return  # no solver for nodes that all stay open
+    _worker['bnc'] = factory(graph, shared=shared, **options)
+
+
+def _solve_tree_node(node):
+    '''
+    Solves the subtree of an open node (key, bound, vertices fixed to 0, vertices fixed to 1,
+    tight rows of the parent as (vertices, rhs)) with the worker's own LP
+    returns (key, best clique, search nodes, bound of the part left open by the deadline or None)
+    '''
+    key, bound, zeros, ones, cuts = node
+    bnc = _worker.get('bnc')
+    if bnc is None:  # started after the deadline
+        return key, [], 0, bound
+    bnc.sync_incumbent()
+    if bound <= bnc.current_maximum_clique_len or bnc.shared.proved():
+        return key, bnc.current_max_clique, 0, None
+    if bnc.out_of_time():
+        return key, bnc.current_max_clique, 0, bound
+    fixed = bnc.enter_node(zeros, ones, bound)
+    if fixed is None:
+        return key, bnc.current_max_clique, 0, None
+    before = bnc.branch_num
+    try:
+        bnc.add_cuts([(vertices, 'NODE_{0}_{1}'.format(key, k), rhs) for k, (vertices, rhs) in enumerate(cuts)])
+        bnc.solve
+    finally:
+        bnc.leave_node(fixed)
+    return key, bnc.current_max_clique, bnc.branch_num - before, bnc.timeout_bound if bnc.timed_out else None
+
+
+def tree_search(bnc, factory, options, processes, ramp_up=4, grace=10.0):
+    '''
+    Parallel tree search. The master (bnc, sharing its incumbent through bnc.shared) owns
+    the node queue: it expands nodes best bound first until ramp_up * processes nodes are open,
+    then dispatches them, serialized as bound changes plus the rows tight at their parent,
+    to a pool of processes, each with its own factory(bnc.graph, shared=..., **options)
+    solver and LP, largest bound first. The incumbent and the best bound of unfinished
+    nodes are broadcast through shared memory, every worker prunes with the latest values
+    and stops once the incumbent is proved optimal. Nodes of workers still running grace seconds
+    after the deadline stay open at their bound
+    returns statistics
+    '''
+    stats = {'parallel_workers': processes, 'parallel_ramp_up_nodes': 1,
+             'parallel_tasks': 0, 'parallel_worker_nodes': 0}
+    clique, branching_variable = bnc.process_node()
+    if branching_variable is None:
+        return stats
+
+    keys = itertools.count()
+    queue = []
+
+    def push(branching_variable, zeros, ones):
+        v = int(branching_variable)
+        bound, cuts = bnc.current_obj_sum, bnc.tight_cuts()
+        heapq.heappush(queue, (-bound, next(keys), zeros, ones + (v,), cuts))
+        heapq.heappush(queue, (-bound, next(keys), zeros + (v,), ones, cuts))
+
+    push(branching_variable, (), ())
+    while queue and len(queue) < ramp_up * processes and not bnc.out_of_time():
+        bound, key, zeros, ones, cuts = heapq.heappop(queue)
+        if -bound <= bnc.current_maximum_clique_len:
+            continue
+        fixed = bnc.enter_node(zeros, ones, -bound)
+        if fixed is None:
+            continue
+        stats['parallel_ramp_up_nodes'] += 1
+        clique, branching_variable = bnc.process_node()
+        if branching_variable is not None:
+            push(branching_variable, zeros, ones)
+        bnc.leave_node(fixed)
+
+    nodes = [(key, -bound, zeros, ones, cuts) for bound, key, zeros, ones, cuts in sorted(queue)
+             if -bound > bnc.current_maximum_clique_len]
+    if not nodes:
+        return stats
+    open_bounds = dict((node[0], node[1]) for node in nodes)
+    if bnc.out_of_time():  # the ramp-up used up the time, no workers
+        bnc.add_open_bound(max(open_bounds.values()))
+        return stats
+    bnc.shared.set_bound(max(open_bounds.values()))
+    stats['parallel_tasks'] = len(nodes)
+    pool = multiprocessing.Pool(processes, _init_tree_worker, (factory, bnc.graph, options, bnc.shared))
+    try:
+        solved = pool.imap_unordered(_solve_tree_node, nodes)
+        expired_at = None
+        while open_bounds:
+            if expired_at is None and bnc.out_of_time():
+                expired_at = time.time()
+            try:
+                key, clique, searched, open_bound = solved.next(timeout=1.0)
+            except multiprocessing.TimeoutError:
+                # workers stop at the deadline on their own, unless stuck: their nodes stay open
+                if expired_at is not None and time.time() >= expired_at + grace:
+                    bnc.add_open_bound(max(open_bounds.values()))
+                    break
+                continue
+            bnc.update_incumbent(clique)
+            bnc.add_open_bound(open_bound)
+            stats['parallel_worker_nodes'] += searched
+            del open_bounds[key]
+            bnc.shared.set_bound(max(open_bounds.values() + [bnc.current_maximum_clique_len]))
+    finally:
+        pool.terminate()
+        pool.join()
+    return stats
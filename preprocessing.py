@@ -0,0 +1,131 @@
+import heapq
+
+import networkx as nx
+
+from separation import colour_classes
+from utils import iter_bits
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+def peel(bnc_class, clique_size, edges=True):
+    '''
+    k-core peeling driven by the incumbent size q = clique_size:
+    a vertex of a clique larger than q has degree >= q, an edge of it has
+    >= q - 1 common neighbours. Vertices and edges failing that are removed
+    from the bitset adjacency, alive_mask and the graph, repeatedly, since
+    every removal lowers other degrees and common neighbourhoods.
+    returns (removed vertices, number of removed edges)
+    '''
+    adj_bits = bnc_class.adj_bits
+    order = bnc_class.order
+    alive = bnc_class.alive_mask
+    removed = []
+    removed_edges = []
+
+    queue = [i for i in iter_bits(alive) if _popcount(adj_bits[i]) < clique_size]
+    while True:
+        before = len(removed) + len(removed_edges)
+        while queue:
+            i = queue.pop()
+            if not alive >> i & 1:
+                continue
+            alive &= ~(1 << i)
+            removed.append(i)
+            for j in iter_bits(adj_bits[i]):
+                adj_bits[j] &= ~(1 << i)
+                if _popcount(adj_bits[j]) < clique_size:
+                    queue.append(j)
+            adj_bits[i] = 0
+
+        if edges and clique_size >= 2:
+            for i in iter_bits(alive):
+                for j in iter_bits(adj_bits[i] >> (i + 1) << (i + 1)):
+                    if _popcount(adj_bits[i] & adj_bits[j]) < clique_size - 1:
+                        adj_bits[i] &= ~(1 << j)
+                        adj_bits[j] &= ~(1 << i)
+                        removed_edges.append((order[i], order[j]))
+            queue = [i for i in iter_bits(alive) if _popcount(adj_bits[i]) < clique_size]
+        if len(removed) + len(removed_edges) == before:
+            break
+
+    bnc_class.alive_mask = alive
+    removed = [order[i] for i in removed]
+    bnc_class.graph.remove_edges_from(removed_edges)
+    bnc_class.graph.remove_nodes_from(removed)
+    return removed, len(removed_edges)
+
+
+def colouring_bound(graph, nodes):
+    '''
+    Number of colours of a greedy (largest first) colouring of the subgraph on nodes,
+    an upper bound on its clique number
+    '''
+    colouring = nx.coloring.greedy_color(graph.subgraph(nodes), strategy=nx.coloring.strategy_largest_first)
+    return len(set(colouring.values()))
+
+
+def components_by_bound(graph):
+    '''
+    Connected components with a greedy colouring bound on their clique number
+    returns list of (bound, vertices), largest bound first
+    '''
+    components = [(colouring_bound(graph, nodes), sorted(nodes)) for nodes in nx.connected_components(graph)]
+    components.sort(key=lambda component: -component[0])
+    return components
+
+
+def degeneracy_order(bnc_class):
+    '''
+    Bit indices of the alive vertices in the order of repeatedly removing a vertex of minimum
+    degree, every vertex has at most degeneracy-many neighbours later in the order
+    '''
+    adj_bits = bnc_class.adj_bits
+    alive = bnc_class.alive_mask
+    degree = dict((i, _popcount(adj_bits[i] & alive)) for i in iter_bits(alive))
+    heap = [(d, i) for i, d in degree.items()]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        d, i = heapq.heappop(heap)
+        if not alive >> i & 1 or d != degree[i]:
+            continue  # stale entry
+        alive &= ~(1 << i)
+        order.append(i)
+        for j in iter_bits(adj_bits[i] & alive):
+            degree[j] -= 1
+            heapq.heappush(heap, (degree[j], j))
+    return order
+
+
+def later_neighbourhoods(bnc_class, clique_size):
+    '''
+    Subproblems of the degeneracy decomposition: every clique of the graph is v plus a clique
+    of the neighbours of v later in the degeneracy order, v its earliest vertex. Subproblems
+    whose bound 1 + greedy colouring bound of the later neighbours does not exceed clique_size
+    are dropped. Once the deadline passed, the vertices not reached yet form one subproblem
+    without a root instead.
+    returns list of (bound, vertices, root v or None), largest bound first
+    '''
+    adj_bits = bnc_class.adj_bits
+    order = bnc_class.order
+    deadline = bnc_class.deadline
+    degeneracy = degeneracy_order(bnc_class)
+    later = bnc_class.alive_mask
+    subproblems = []
+    for position, i in enumerate(degeneracy):
+        if deadline is not None and deadline.expired():
+            subproblems.append((len(colour_classes(bnc_class, later)),
+                                sorted(order[j] for j in degeneracy[position:]), None))
+            break
+        later &= ~(1 << i)
+        neighbours = adj_bits[i] & later
+        if _popcount(neighbours) < clique_size:
+            continue
+        bound = 1 + len(colour_classes(bnc_class, neighbours))
+        if bound > clique_size:
+            subproblems.append((bound, sorted(order[j] for j in iter_bits(neighbours)), order[i]))
+    subproblems.sort(key=lambda subproblem: -subproblem[0])
+    return subproblems
@@ -0,0 +1,372 @@
+import heapq
+import time
+
+from utils import find_mwis, iter_bits
+
+# score weights of the multi-start greedy, alpha * weight - (1 - alpha) * normalized degree
+SCORE_WEIGHTS = (0.7, 1.0, 0.4)
+# near-violated sets (LP weight above this) are improved by local search
+LOCAL_SEARCH_THRESHOLD = 0.75
+
+
+def greedy_independent_set(bnc_class, seed, ranked, candidates_mask):
+    '''
+    Independent set which starts from seed and then takes compatible vertices in ranked order
+    ranked: bit numbers of candidate vertices, best score first
+    '''
+    adj_bits = bnc_class.adj_bits
+    ind_set = [seed]
+    allowed = candidates_mask & ~adj_bits[seed] & ~(1 << seed)
+    for i in ranked:
+        if not allowed:
+            break
+        if allowed >> i & 1:
+            ind_set.append(i)
+            allowed &= ~adj_bits[i] & ~(1 << i)
+    return ind_set
+
+
+def _mask_weight(mask, weights):
+    return sum(weights[i] for i in iter_bits(mask))
+
+
+def _improve(bnc_class, mask, weights, candidates_mask):
+    '''
+    Local search to a local optimum: adds free vertices, then applies
+    improving (1,2)- and (1,1)-swaps (one vertex out, up to two in)
+    '''
+    adj_bits = bnc_class.adj_bits
+    precision = bnc_class.precision
+    improved = True
+    while improved:
+        improved = False
+        blocked = mask
+        for v in iter_bits(mask):
+            blocked |= adj_bits[v]
+        free = candidates_mask & ~blocked
+        while free:
+            i = max(iter_bits(free), key=lambda j: weights[j])
+            mask |= 1 << i
+            free &= ~adj_bits[i] & ~(1 << i)
+
+        for v in iter_bits(mask):
+            rest = mask & ~(1 << v)
+            rest_blocked = rest
+            for u in iter_bits(rest):
+                rest_blocked |= adj_bits[u]
+            # candidates whose only neighbour in the set is v
+            one_tight = sorted(iter_bits(candidates_mask & ~rest_blocked & ~(1 << v)), key=lambda j: -weights[j])
+            best_gain, best_swap = precision, None
+            for k, u in enumerate(one_tight):
+                if weights[u] - weights[v] > best_gain:
+                    best_gain, best_swap = weights[u] - weights[v], 1 << u
+                for w in one_tight[k + 1:]:
+                    if not adj_bits[u] >> w & 1:
+                        if weights[u] + weights[w] - weights[v] > best_gain:
+                            best_gain, best_swap = weights[u] + weights[w] - weights[v], (1 << u) | (1 << w)
+                        break  # one_tight is sorted, w is the heaviest partner of u
+            if best_swap is not None:
+                mask = rest | best_swap
+                improved = True
+                break
+    return mask
+
+
+def local_search(bnc_class, mask, weights, candidates_mask, perturbations):
+    '''
+    Iterated local search over the fractional support on the bitset adjacency:
+    swap descent, then weighted perturbations (a random outside vertex, chosen
+    with probability proportional to its LP value, is forced in and its
+    neighbours are dropped) followed by another descent; keeps the best set
+    '''
+    adj_bits = bnc_class.adj_bits
+    rng = bnc_class.random
+    best = _improve(bnc_class, mask, weights, candidates_mask)
+    best_weight = _mask_weight(best, weights)
+    for _ in range(perturbations):
+        outside = list(iter_bits(candidates_mask & ~best))
+        if not outside:
+            break
+        pick = rng.uniform(0.0, sum(weights[i] for i in outside))
+        for u in outside:
+            pick -= weights[u]
+            if pick <= 0:
+                break
+        mask = _improve(bnc_class, (best & ~adj_bits[u]) | (1 << u), weights, candidates_mask)
+        weight = _mask_weight(mask, weights)
+        if weight > best_weight + bnc_class.precision:
+            best, best_weight = mask, weight
+    return best, best_weight
+
+
+def violated_independent_sets(bnc_class, max_sets, perturbations=10):
+    '''
+    Up to max_sets distinct independent sets with LP weight > 1 over clique candidates
+    (the fractional support): find_mwis first, then greedy runs started
+    from every high-weight vertex under several score weights.
+    Sets heavier than LOCAL_SEARCH_THRESHOLD go through local_search.
+    returns list of (vertices, weight), heaviest first
+    '''
+    precision = bnc_class.precision
+    stats = bnc_class.separation_stats
+    found = {}
+    seen = set()
+
+    bit_index = bnc_class.bit_index
+    weights = dict((bit_index[v], w) for v, w in zip(bnc_class.clique_candidates, bnc_class.clique_candidates_weights))
+    candidates_mask = 0
+    for i in weights:
+        candidates_mask |= 1 << i
+
+    order = bnc_class.order
+
+    failures = [0]
+
+    def consider(mask):
+        if mask in seen:
+            return
+        seen.add(mask)
+        weight = _mask_weight(mask, weights)
+        violated = weight > 1 + precision
+        # violated sets only descend to be deeper, near-violated ones also get perturbations,
+        # until max_sets of them in a row failed to become violated
+        if weight > LOCAL_SEARCH_THRESHOLD and (violated or failures[0] < max_sets):
+            stats['ls_calls'] += 1
+            mask, improved_weight = local_search(bnc_class, mask, weights, candidates_mask,
+                                                 0 if violated else perturbations)
+            if improved_weight > weight + precision:
+                stats['ls_improved'] += 1
+            if not violated:
+                if improved_weight > 1 + precision:
+                    stats['ls_rescued'] += 1
+                    failures[0] = 0
+                else:
+                    failures[0] += 1
+            weight = improved_weight
+        if weight > 1 + precision:
+            found.setdefault(frozenset(order[i] for i in iter_bits(mask)), weight)
+
+    mask = 0
+    for tpl_a in find_mwis(bnc_class):
+        mask |= 1 << bit_index[tpl_a[0]]
+    consider(mask)
+
+    degree = bnc_class.graph.degree
+    scale = max(len(order) - 1.0, 1.0)
+    seeds = sorted(weights, key=lambda i: -weights[i])
+
+    for alpha in SCORE_WEIGHTS:
+        ranked = sorted(weights, key=lambda i: -(alpha * weights[i] - (1 - alpha) * degree[order[i]] / scale))
+        for seed in seeds[:4 * max_sets]:
+            if len(found) >= max_sets:
+                break
+            mask = 0
+            for i in greedy_independent_set(bnc_class, seed, ranked, candidates_mask):
+                mask |= 1 << i
+            consider(mask)
+
+    return sorted(found.items(), key=lambda pair: -pair[1])[:max_sets]
+
+
+class _budget_exhausted(Exception):
+    pass
+
+
+def exact_mwis(bnc_class, max_nodes=20000, max_time=1.0):
+    '''
+    Maximum weight independent set over clique candidates (the fractional support)
+    Branch and bound on cliques of the complement graph with bitsets:
+    a greedy colouring of the complement (every class is a clique of the graph,
+    so an independent set takes at most one vertex per class) bounds
+    the weight of any extension by the sum of class maxima.
+    Stops after max_nodes search nodes or max_time seconds.
+    returns (vertices, weight, proved optimal)
+    '''
+    candidates = sorted(zip(bnc_class.clique_candidates_weights, bnc_class.clique_candidates), reverse=True)
+    weights = [w for w, v in candidates]
+    vertices = [v for w, v in candidates]
+    bit_index = bnc_class.bit_index
+    local = dict((bit_index[v], i) for i, v in enumerate(vertices))
+    full = (1 << len(vertices)) - 1
+
+    # local non-adjacency (complement) bitsets, lowest bit = heaviest vertex
+    non_adjacent = []
+    for v in vertices:
+        mask = 0
+        for j in iter_bits(bnc_class.adj_bits[bit_index[v]]):
+            if j in local:
+                mask |= 1 << local[j]
+        non_adjacent.append(full & ~mask & ~(1 << len(non_adjacent)))
+
+    precision = bnc_class.precision
+    state = {'best': [], 'best_weight': 0.0, 'nodes': 0}
+    deadline = time.time() + max_time
+
+    def colour_bound(candidates_mask):
+        ordered = []
+        uncoloured = candidates_mask
+        bound = 0.0
+        while uncoloured:
+            colour_class = uncoloured
+            heaviest = 0.0
+            while colour_class:
+                low = colour_class & -colour_class
+                i = low.bit_length() - 1
+                heaviest = max(heaviest, weights[i])
+                colour_class &= ~non_adjacent[i] & ~low
+                uncoloured &= ~low
+                ordered.append([i, 0.0])
+            bound += heaviest
+            for item in ordered[::-1]:
+                if item[1]:
+                    break
+                item[1] = bound
+        return ordered
+
+    def expand(current, current_weight, candidates_mask):
+        state['nodes'] += 1
+        if state['nodes'] >= max_nodes or (state['nodes'] & 255 == 0 and time.time() > deadline):
+            raise _budget_exhausted()
+        if current_weight > state['best_weight']:
+            state['best'], state['best_weight'] = list(current), current_weight
+        for i, bound in colour_bound(candidates_mask)[::-1]:
+            if current_weight + bound <= state['best_weight'] + precision:
+                return
+            current.append(i)
+            expand(current, current_weight + weights[i], candidates_mask & non_adjacent[i])
+            current.pop()
+            candidates_mask &= ~(1 << i)
+
+    try:
+        expand([], 0.0, full)
+        proved = True
+    except _budget_exhausted:
+        proved = False
+    return frozenset(vertices[i] for i in state['best']), state['best_weight'], proved
+
+
+def colour_classes(bnc_class, mask):
+    '''
+    Greedy sequential colouring of the vertices of mask, most neighbours within mask first:
+    every vertex joins the first class holding none of its neighbours
+    returns list of colour classes (independent sets) as bitsets,
+    their number bounds the clique number of mask
+    '''
+    adj_bits = bnc_class.adj_bits
+    classes = []
+    blocked = []  # neighbourhood of each class
+    for i in sorted(iter_bits(mask), key=lambda j: -bin(adj_bits[j] & mask).count('1')):
+        bit = 1 << i
+        for k, neighbours in enumerate(blocked):
+            if not neighbours & bit:
+                classes[k] |= bit
+                blocked[k] |= adj_bits[i]
+                break
+        else:
+            classes.append(bit)
+            blocked.append(adj_bits[i])
+    return classes
+
+
+def lift_independent_set(bnc_class, vertices):
+    '''
+    Greedily extends an independent set to a maximal one in the whole graph,
+    preferring vertices which are often fractional in LP solutions, then low degree ones
+    (the lifted row dominates the original one at no LP cost)
+    returns list of vertices
+    '''
+    adj_bits = bnc_class.adj_bits
+    bit_index = bnc_class.bit_index
+    order = bnc_class.order
+    fractional_count = bnc_class.fractional_count
+    degree = bnc_class.graph.degree
+
+    mask = 0
+    blocked = 0
+    for v in vertices:
+        i = bit_index[v]
+        mask |= 1 << i
+        blocked |= adj_bits[i]
+    allowed = bnc_class.alive_mask & ~blocked & ~mask
+    while allowed:
+        i = max(iter_bits(allowed), key=lambda j: (fractional_count[j], -degree[order[j]]))
+        mask |= 1 << i
+        allowed &= ~adj_bits[i] & ~(1 << i)
+    return [order[i] for i in iter_bits(mask)]
+
+
+def _simple_odd_cycle(walk):
+    '''
+    Simple odd cycle contained in a closed walk of odd length (walk[0] == walk[-1])
+    '''
+    cycle = walk[:-1]
+    while True:
+        position = {}
+        for j, v in enumerate(cycle):
+            if v in position:
+                i = position[v]
+                # split at the repeated vertex and keep the odd part
+                cycle = cycle[i:j] if (j - i) % 2 else cycle[:i] + cycle[j:]
+                break
+            position[v] = j
+        else:
+            return cycle
+
+
+def odd_hole_cuts(bnc_class, max_cuts, max_sources=20):
+    '''
+    Odd cycle (rank) inequalities of the complement graph:
+    for an odd cycle C of non-edges, sum(x_v, v in C) <= (|C| - 1) / 2.
+    With edge lengths 1 - x_u - x_v a cycle is violated iff it is shorter than 1,
+    so violated cycles are shortest paths from (s, 0) to (s, 1) in the bipartite
+    double cover of the complement graph over fractional vertices
+    returns list of (vertices, rhs), most violated first
+    '''
+    precision = bnc_class.precision
+    adj_bits = bnc_class.adj_bits
+    bit_index = bnc_class.bit_index
+    fractional = [(w, v) for v, w in zip(bnc_class.clique_candidates, bnc_class.clique_candidates_weights)
+                  if w < 1 - precision]
+    fractional.sort(reverse=True)
+    weights = [w for w, v in fractional]
+    vertices = [v for w, v in fractional]
+    bits = [bit_index[v] for v in vertices]
+
+    non_adjacent = [[(j, max(0.0, 1.0 - weights[i] - weights[j])) for j in range(len(vertices))
+                     if j != i and not adj_bits[bits[i]] >> bits[j] & 1]
+                    for i in range(len(vertices))]
+
+    found = {}
+    for source in range(min(len(vertices), max_sources)):
+        if len(found) >= max_cuts:
+            break
+        distance = {(source, 0): 0.0}
+        parent = {}
+        heap = [(0.0, source, 0)]
+        while heap:
+            dist, i, side = heapq.heappop(heap)
+            if (i, side) == (source, 1):
+                break
+            if dist > distance[(i, side)]:
+                continue
+            for j, length in non_adjacent[i]:
+                new_dist = dist + length
+                if new_dist < 1.0 - precision and new_dist < distance.get((j, 1 - side), 1.0):
+                    distance[(j, 1 - side)] = new_dist
+                    parent[(j, 1 - side)] = (i, side)
+                    heapq.heappush(heap, (new_dist, j, 1 - side))
+        if (source, 1) not in parent:
+            continue
+
+        walk = [source]
+        node = (source, 1)
+        while node != (source, 0):
+            node = parent[node]
+            walk.append(node[0])
+        cycle = _simple_odd_cycle(walk)
+        rhs = float((len(cycle) - 1) // 2)
+        violation = sum(weights[i] for i in cycle) - rhs
+        if violation > precision:
+            found.setdefault((frozenset(vertices[i] for i in cycle), rhs), violation)
+
+    return [key for key, violation in sorted(found.items(), key=lambda pair: -pair[1])]
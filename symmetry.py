@@ -0,0 +1,181 @@
+import time
+from collections import defaultdict
+
+from utils import iter_bits
+
+
+def _popcount(mask):
+    return bin(mask).count('1')
+
+
+def refine(adj_bits, cells, splitters=None, deadline=None):
+    '''
+    Equitable refinement of an ordered partition (list of lists of bit numbers): cells are split by
+    the numbers of neighbours in a splitter cell, taken from a queue that starts with splitters
+    (positions of cells, all of them by default; the new singleton is enough after individualizing
+    a vertex of an equitable partition) and gets the parts of every split. Parts are ordered by
+    those numbers and the queue only depends on the shape of the partition, so equal-shaped inputs
+    that are mapped onto each other by an automorphism give equal-shaped results with equal traces.
+    returns (cells, trace) - trace lists every split as (position, (count, part size) of each part),
+    None if the deadline (time.time() value) passed
+    '''
+    cells = [list(cell) for cell in cells]
+    queue = [cells[k] for k in (range(len(cells)) if splitters is None else splitters)]
+    queued = set(id(cell) for cell in queue)
+    trace = []
+    while queue:
+        if deadline is not None and time.time() > deadline:
+            return None
+        splitter = queue.pop(0)
+        if id(splitter) not in queued:
+            continue  # split since it was queued, its parts are queued
+        queued.discard(id(splitter))
+        mask = 0
+        for i in splitter:
+            mask |= 1 << i
+        position = 0
+        while position < len(cells):
+            cell = cells[position]
+            if len(cell) == 1:
+                position += 1
+                continue
+            groups = defaultdict(list)
+            for i in cell:
+                groups[_popcount(adj_bits[i] & mask)].append(i)
+            if len(groups) == 1:
+                position += 1
+                continue
+            parts = [groups[count] for count in sorted(groups)]
+            trace.append((position, tuple((count, len(groups[count])) for count in sorted(groups))))
+            cells[position:position + 1] = parts
+            if id(cell) in queued:
+                queued.discard(id(cell))
+                new = parts
+            else:  # splitting by the cell itself is done, by all parts but one is the same
+                largest = max(range(len(parts)), key=lambda k: (len(parts[k]), -k))
+                new = parts[:largest] + parts[largest + 1:]
+            queue.extend(new)
+            queued.update(id(part) for part in new)
+            position += len(parts)
+    return cells, trace
+
+
+def _individualize(cells, k, i):
+    return cells[:k] + [[i], [j for j in cells[k] if j != i]] + cells[k + 1:]
+
+
+def is_automorphism(adj_bits, permutation):
+    for i, image in permutation.items():
+        mapped = 0
+        for j in iter_bits(adj_bits[i]):
+            mapped |= 1 << permutation[j]
+        if mapped != adj_bits[image]:
+            return False
+    return True
+
+
+def _search(adj_bits, left, right, deadline, generators, path=()):
+    '''
+    Individualization-refinement search for an automorphism mapping the equitable partition
+    left onto right (same trace) cell by cell; path - vertices individualized on the right so far.
+    Candidates in the orbit of one that failed, under the generators fixing path, are skipped
+    returns permutation as dict bit number -> bit number, or None
+    '''
+    (cells_left, trace_left), (cells_right, trace_right) = left, right
+    if trace_left != trace_right or [len(c) for c in cells_left] != [len(c) for c in cells_right]:
+        return None
+    if all(len(cell) == 1 for cell in cells_left):
+        permutation = dict((a[0], b[0]) for a, b in zip(cells_left, cells_right))
+        return permutation if is_automorphism(adj_bits, permutation) else None
+    k = min((len(cell), k) for k, cell in enumerate(cells_left) if len(cell) > 1)[1]
+    target = refine(adj_bits, _individualize(cells_left, k, cells_left[k][0]), [k], deadline)
+    if target is None:
+        return None
+    failed = 0
+    for j in cells_right[k]:
+        if failed >> j & 1:
+            continue
+        candidate = refine(adj_bits, _individualize(cells_right, k, j), [k], deadline)
+        if candidate is None:
+            return None
+        permutation = _search(adj_bits, target, candidate, deadline, generators, path + (j,))
+        if permutation is not None:
+            return permutation
+        failed |= orbit(generators, j, [1 << p for p in path])
+    return None
+
+
+def automorphisms(bnc_class, time_budget=2.0):
+    '''
+    Automorphisms of the alive subgraph found by partition refinement on the bitset adjacency:
+    for every cell of the equitable partition, an automorphism mapping its first vertex onto each
+    vertex not yet known to share its orbit is searched for, until time_budget (or the deadline
+    of the run) runs out
+    returns (generators as dicts bit number -> bit number, True if the search was complete)
+    '''
+    deadline = time.time() + time_budget
+    if bnc_class.deadline is not None and bnc_class.deadline.remaining() is not None:
+        deadline = min(deadline, time.time() + bnc_class.deadline.remaining())
+    adj_bits = bnc_class.adj_bits
+    alive = list(iter_bits(bnc_class.alive_mask))
+    root = refine(adj_bits, [alive] if alive else [], deadline=deadline)
+    if root is None:
+        return [], False
+    parent = dict((i, i) for i in alive)
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    generators = []
+    for k, cell in enumerate(root[0]):
+        if len(cell) == 1:
+            continue
+        first = cell[0]
+        left = refine(adj_bits, _individualize(root[0], k, first), [k], deadline)
+        if left is None:
+            return generators, False
+        for j in cell[1:]:
+            if time.time() > deadline:
+                return generators, False
+            if find(j) == find(first):
+                continue
+            right = refine(adj_bits, _individualize(root[0], k, j), [k], deadline)
+            if right is None:
+                return generators, False
+            permutation = _search(adj_bits, left, right, deadline, generators, (j,))
+            if permutation is not None:
+                generators.append(dict((i, image) for i, image in permutation.items() if i != image))
+                for i, image in permutation.items():
+                    parent[find(i)] = find(image)
+            elif time.time() > deadline:
+                return generators, False
+    return generators, True
+
+
+def _image(permutation, mask):
+    image = 0
+    for i in iter_bits(mask):
+        image |= 1 << permutation.get(i, i)
+    return image
+
+
+def orbit(generators, i, fixed_sets):
+    '''
+    Orbit of bit number i under the group generated by those generators which map each of
+    fixed_sets (bitsets) onto itself (a subgroup of the symmetry group of the node)
+    returns bitset
+    '''
+    stabilizing = [g for g in generators if all(_image(g, mask) == mask for mask in fixed_sets)]
+    orbit_mask = 1 << i
+    queue = [i]
+    while queue:
+        j = queue.pop()
+        for g in stabilizing:
+            image = g.get(j, j)
+            if not orbit_mask >> image & 1:
+                orbit_mask |= 1 << image
+                queue.append(image)
+    return orbit_mask
@@ -1,25 +1,68 @@
-import thread
-import threading
+import cPickle as pickle
+import hashlib
+import multiprocessing
+import os
 import time
-from contextlib import contextmanager
 
 import networkx as nx
 
 
-class TimeoutException(Exception):
-    pass
+class deadline(object):
+    '''
+    Cooperative time limit of a run, checked by the search and by the LP engine
+    during solves; cancel() ends it early, also in the worker processes: the flag
+    is in shared memory, so the deadline must reach workers by inheritance
+    (as a Process or Pool initializer argument), not pickled
+    '''
+
+    def __init__(self, seconds=None):
+        self.at = None if seconds is None else time.time() + seconds
+        self.cancelled = multiprocessing.RawValue('b', 0)
+
+    def remaining(self):
+        '''
+        returns seconds left, None without a limit
+        '''
+        if self.cancelled.value:
+            return 0.0
+        return None if self.at is None else max(self.at - time.time(), 0.0)
+
+    def expired(self):
+        return bool(self.cancelled.value) or self.at is not None and time.time() >= self.at
+
+    def cancel(self):
+        self.cancelled.value = 1
+
+
+def graph_hash(graph):
+    '''
+    Digest of the sorted vertex and edge lists, identifies the graph of a checkpoint
+    '''
+    edges = sorted(tuple(sorted(edge)) for edge in graph.edges())
+    return hashlib.sha1(repr((sorted(graph.nodes()), edges))).hexdigest()
+
+
+def write_checkpoint(path, state):
+    '''
+    Pickles state to path through a temporary file renamed over it,
+    so that a run killed while writing leaves the previous checkpoint intact
+    '''
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as file:
+        pickle.dump(state, file, pickle.HIGHEST_PROTOCOL)
+        file.flush()
+        os.fsync(file.fileno())
+    os.rename(temporary, path)
 
 
-@contextmanager
-def time_limit(seconds):
-    timer = threading.Timer(seconds, lambda: thread.interrupt_main())
-    timer.start()
-    try:
-        yield
-    except KeyboardInterrupt:
-        raise TimeoutException()
-    finally:
-        timer.cancel()
+def read_checkpoint(path):
+    '''
+    returns the state saved by write_checkpoint, None if there is no checkpoint yet
+    '''
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as file:
+        return pickle.load(file)
 
 
 def timing(f):
@@ -27,9 +70,9 @@ def timing(f):
     Measures time of function execution
     '''
 
-    def wrap(*args):
+    def wrap(*args, **kwargs):
         time1 = time.time()
-        ret = f(*args)
+        ret = f(*args, **kwargs)
         time2 = time.time()
         print '\n{0} function took {1:.3f} ms'.format(
             f.__name__, (time2 - time1) * 1000.0)
@@ -50,6 +93,34 @@ def read_dimacs_graph(file_path):
         return nx.Graph(edges)
 
 
+def bitset_adjacency(graph):
+    '''
+    Bitset adjacency: vertices are numbered 0..n-1 in sorted order,
+    bit j of adjacency[i] is set if vertices order[i] and order[j] are connected
+    returns (order, index - dict vertex -> bit number, adjacency)
+    '''
+    order = sorted(graph.nodes)
+    index = dict((v, i) for i, v in enumerate(order))
+    adjacency = []
+    for v in order:
+        mask = 0
+        for u in graph[v]:
+            if u != v:
+                mask |= 1 << index[u]
+        adjacency.append(mask)
+    return order, index, adjacency
+
+
+def iter_bits(mask):
+    '''
+    Bit numbers set in mask, lowest first
+    '''
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
 def arguments():
     import argparse
     parser = argparse.ArgumentParser(
@@ -58,7 +129,70 @@ def arguments():
                         help='Path to dimacs-format graph file')
     parser.add_argument('--time', type=int, default=60,
                         help='Time limit in seconds')
-    return parser.parse_args()
+    parser.add_argument('--lp', type=str, default='simplex', choices=['simplex', 'cplex'],
+                        help='LP engine for the reduced master problem')
+    parser.add_argument('--cut-age', type=int, default=10,
+                        help='Number of consecutive LP solves with positive slack before a cut leaves the LP')
+    parser.add_argument('--stats', action='store_true',
+                        help='Print search statistics')
+    parser.add_argument('--cut-batch', type=int, default=8,
+                        help='Maximum number of independent-set cuts added per separation round')
+    parser.add_argument('--exact-nodes', type=int, default=20000,
+                        help='Node budget of exact MWIS separation per call')
+    parser.add_argument('--exact-time', type=float, default=1.0,
+                        help='Time budget in seconds of exact MWIS separation per call')
+    parser.add_argument('--ls-perturbations', type=int, default=10,
+                        help='Iterated local search perturbations per near-violated independent set')
+    parser.add_argument('--root-cut-rounds', type=int, default=100,
+                        help='Separation rounds allowed at the root, halved at every level of the tree')
+    parser.add_argument('--tail-gain', type=float, default=1e-3,
+                        help='Minimum relative bound improvement over the last rounds to keep separating')
+    parser.add_argument('--heuristic-time', type=float, default=1.0,
+                        help='Time budget in seconds of the initial clique heuristic')
+    parser.add_argument('--rounding-steps', type=int, default=100,
+                        help='Local search steps of the LP rounding heuristic run at every node')
+    parser.add_argument('--peeling', type=str, default='edges', choices=['none', 'vertices', 'edges'],
+                        help='Remove vertices (and edges) which cannot be in a clique larger than the incumbent')
+    parser.add_argument('--decomposition', choices=['none', 'components', 'degeneracy'], default='components',
+                        help='Solve connected components or later neighbourhoods of the degeneracy order '
+                             'of the preprocessed graph as independent problems')
+    parser.add_argument('--node-colouring', choices=['none', 'bound', 'rows'], default='rows',
+                        help='Prune nodes by a greedy colouring before the LP (and add its classes as rows)')
+    parser.add_argument('--mcq-vertices', type=int, default=150,
+                        help='Nodes with at most this many candidate vertices go to the combinatorial solver')
+    parser.add_argument('--mcq-density', type=float, default=0.1,
+                        help='Nodes with candidate density at most this go to the combinatorial solver')
+    parser.add_argument('--portfolio', action='store_true',
+                        help='Race several solver configurations in parallel (--processes of them, all if 1)')
+    parser.add_argument('--parallel-search', action='store_true',
+                        help='Solve open nodes of the search tree in --processes worker processes')
+    parser.add_argument('--race-depth', type=int, default=0,
+                        help='Solve both children of branchings above this depth concurrently (2 ** depth processes)')
+    parser.add_argument('--branching', default='reliability',
+                        choices=['value', 'reliability', 'fractional_neighbours', 'last_colour', 'colouring_reduction'],
+                        help='Branching rule: largest fractional LP value, reliability (pseudo-cost) branching, '
+                             'most fractional neighbours, last colour class, largest colouring bound reduction')
+    parser.add_argument('--reliability', type=int, default=4,
+                        help='Observations per direction after which pseudo-costs replace strong branching')
+    parser.add_argument('--strong-candidates', type=int, default=8,
+                        help='Unreliable candidates evaluated by strong branching per node')
+    parser.add_argument('--strong-iterations', type=int, default=10,
+                        help='Dual simplex iterations per strong branching child')
+    parser.add_argument('--symmetry-time', type=float, default=2.0,
+                        help='Seconds for automorphism detection (orbital branching), 0 disables it')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Worker processes for independent subproblems')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='File for periodic checkpoints of the sequential search (open nodes, incumbent, '
+                             'cut pool, pseudo-costs), also written when the run times out or gets SIGTERM')
+    parser.add_argument('--checkpoint-interval', type=float, default=60.0,
+                        help='Seconds between checkpoints')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the search saved in --checkpoint (a fresh start if the file does not exist)')
+    args = parser.parse_args()
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume needs --checkpoint')
+    return args
 
 
 def find_mwis(bnc_class):
@@ -82,11 +216,11 @@ def find_mwis(bnc_class):
 
     def incorporate_mwis(curr_mwis, mwis_cand_list):
         best_candidate = max(mwis_cand_list, key=lambda x: compute_score(x))
-        best_cand_neighbors = bnc_class.adj_matrix[best_candidate[0] - 1].todense()  # returned row of adj matrix - 2d scipy matrix
+        best_cand_neighbors = bnc_class.graph[best_candidate[0]]
 
         new_curr_mwis = curr_mwis + [best_candidate]
         new_cand_list = [cand_ for cand_ in mwis_cand_list if
-                         (cand_[0] != best_candidate[0]) & (best_cand_neighbors[0, cand_[0] - 1] != 1)]
+                         (cand_[0] != best_candidate[0]) & (cand_[0] not in best_cand_neighbors)]
 
         if not new_cand_list:
             return new_curr_mwis